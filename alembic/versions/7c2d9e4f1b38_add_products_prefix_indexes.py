@@ -0,0 +1,41 @@
+"""add products prefix indexes
+
+Revision ID: 7c2d9e4f1b38
+Revises: e81b5c2f6a94
+Create Date: 2026-10-17 13:20:44.187230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2d9e4f1b38'
+down_revision: Union[str, Sequence[str], None] = 'e81b5c2f6a94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # COLLATE "C": побайтовый порядок позволяет использовать индекс для LIKE 'q%'
+    op.create_index(
+        'ix_products_name_prefix',
+        'products',
+        [sa.text('(lower(name) COLLATE "C")')],
+        unique=False,
+    )
+    op.create_index(
+        'ix_products_sku_prefix',
+        'products',
+        [sa.text('(lower(sku) COLLATE "C")')],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_sku_prefix', table_name='products')
+    op.drop_index('ix_products_name_prefix', table_name='products')
@@ -0,0 +1,28 @@
+"""add carpets updated_at
+
+Revision ID: 9cf85c47a560
+Revises: b5e8a3d1c7f2
+Create Date: 2026-10-17 03:44:50.968929
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9cf85c47a560'
+down_revision: Union[str, Sequence[str], None] = 'b5e8a3d1c7f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('carpets', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('carpets', 'updated_at')
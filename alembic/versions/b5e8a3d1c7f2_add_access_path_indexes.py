@@ -0,0 +1,76 @@
+"""add access path indexes
+
+Revision ID: b5e8a3d1c7f2
+Revises: 7c2d9e4f1b38
+Create Date: 2026-10-17 14:02:51.640219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e8a3d1c7f2'
+down_revision: Union[str, Sequence[str], None] = '7c2d9e4f1b38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_products_category_id_id', 'products', ['category_id', 'id'], unique=False)
+    op.create_index('ix_products_price_id', 'products', ['price', 'id'], unique=False)
+    op.create_index('ix_products_name_id', 'products', ['name', 'id'], unique=False)
+    # (name, id) покрывает все запросы одиночного индекса по name
+    op.drop_index('ix_products_name', table_name='products')
+
+    op.create_index('ix_carpets_width_length', 'carpets', ['width', 'length'], unique=False)
+    op.create_index('ix_categories_parent_id', 'categories', ['parent_id'], unique=False)
+
+    op.create_index(
+        'ix_product_photos_product_id_sort_order',
+        'product_photos',
+        ['product_id', 'sort_order'],
+        unique=False,
+    )
+    op.drop_index('ix_product_photos_product_id', table_name='product_photos')
+
+    # Перед уникальным индексом оставляем одно главное фото на товар:
+    # первое по (sort_order, id)
+    op.execute(
+        """
+        UPDATE product_photos AS p
+        SET is_main = false
+        WHERE p.is_main
+          AND EXISTS (
+              SELECT 1
+              FROM product_photos AS o
+              WHERE o.product_id = p.product_id
+                AND o.is_main
+                AND (coalesce(o.sort_order, 0), o.id)
+                    < (coalesce(p.sort_order, 0), p.id)
+          )
+        """
+    )
+    op.create_index(
+        'uq_product_photos_main',
+        'product_photos',
+        ['product_id'],
+        unique=True,
+        postgresql_where=sa.text('is_main'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_product_photos_main', table_name='product_photos', postgresql_where=sa.text('is_main'))
+    op.create_index('ix_product_photos_product_id', 'product_photos', ['product_id'], unique=False)
+    op.drop_index('ix_product_photos_product_id_sort_order', table_name='product_photos')
+    op.drop_index('ix_categories_parent_id', table_name='categories')
+    op.drop_index('ix_carpets_width_length', table_name='carpets')
+    op.create_index('ix_products_name', 'products', ['name'], unique=False)
+    op.drop_index('ix_products_name_id', table_name='products')
+    op.drop_index('ix_products_price_id', table_name='products')
+    op.drop_index('ix_products_category_id_id', table_name='products')
@@ -0,0 +1,57 @@
+"""add category closure table
+
+Revision ID: c3a91f0d7b2e
+Revises: 90ed1a15e3bf
+Create Date: 2026-10-17 10:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a91f0d7b2e'
+down_revision: Union[str, Sequence[str], None] = '90ed1a15e3bf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'category_closure',
+        sa.Column('ancestor_id', sa.BigInteger(), nullable=False),
+        sa.Column('descendant_id', sa.BigInteger(), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ancestor_id'], ['categories.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['descendant_id'], ['categories.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id'),
+    )
+    op.create_index(
+        'ix_category_closure_descendant_id',
+        'category_closure',
+        ['descendant_id', 'depth'],
+        unique=False,
+    )
+
+    # Заполняем замыкание для существующей иерархии
+    op.execute(
+        """
+        WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM categories
+            UNION ALL
+            SELECT tree.ancestor_id, c.id, tree.depth + 1
+            FROM tree JOIN categories c ON c.parent_id = tree.descendant_id
+        )
+        INSERT INTO category_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, descendant_id, depth FROM tree
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_category_closure_descendant_id', table_name='category_closure')
+    op.drop_table('category_closure')
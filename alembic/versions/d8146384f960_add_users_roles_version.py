@@ -0,0 +1,28 @@
+"""add users roles_version
+
+Revision ID: d8146384f960
+Revises: 9cf85c47a560
+Create Date: 2026-10-17 03:52:13.832154
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8146384f960'
+down_revision: Union[str, Sequence[str], None] = '9cf85c47a560'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('roles_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'roles_version')
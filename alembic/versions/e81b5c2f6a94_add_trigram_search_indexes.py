@@ -0,0 +1,47 @@
+"""add trigram search indexes
+
+Revision ID: e81b5c2f6a94
+Revises: 4d7e2b9c1a05
+Create Date: 2026-10-17 12:41:09.305517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e81b5c2f6a94'
+down_revision: Union[str, Sequence[str], None] = '4d7e2b9c1a05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TRIGRAM_INDEXES = (
+    ('ix_products_name_trgm', 'products', 'name'),
+    ('ix_products_description_trgm', 'products', 'description'),
+    ('ix_carpets_material_trgm', 'carpets', 'material'),
+    ('ix_carpets_origin_trgm', 'carpets', 'origin'),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        op.create_index(
+            name,
+            table,
+            [column],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, column in reversed(TRIGRAM_INDEXES):
+        op.drop_index(name, table_name=table, postgresql_using='gin')
+    # Расширение не удаляется: им могут пользоваться объекты вне этой миграции
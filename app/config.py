@@ -1,5 +1,6 @@
 import os
 from dotenv import load_dotenv
+from sqlalchemy.engine import make_url
 
 load_dotenv()
 
@@ -14,6 +15,38 @@ DATABASE_URL = (
     os.getenv("DATABASE_URL")
     or f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
+# Async driver for request handlers: same database via asyncpg by default
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or make_url(DATABASE_URL).set(
+    drivername="postgresql+asyncpg"
+).render_as_string(hide_password=False)
+
+# Optional read replica for GET endpoints; empty sends every query to the primary
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL", "")
+ASYNC_DATABASE_REPLICA_URL = (
+    make_url(DATABASE_REPLICA_URL)
+    .set(drivername="postgresql+asyncpg")
+    .render_as_string(hide_password=False)
+    if DATABASE_REPLICA_URL
+    else ""
+)
+# Replica lag in seconds above which reads fall back to the primary
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+# How often replica lag is re-checked, seconds
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "1"))
+# After a write, the client's (and the worker's) reads stay on the primary this long
+READ_AFTER_WRITE_SECONDS = float(os.getenv("READ_AFTER_WRITE_SECONDS", "5"))
+
+# Connection pool, per engine and per worker process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds to wait for a free connection before failing the request
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Reconnect connections older than this many seconds (-1 disables)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Test connections on checkout, dropping ones closed by the server
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Running behind PgBouncer in transaction mode: no prepared statement caching
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes")
 
 # JWT configuration
 JWT_SECRET = os.getenv("JWT_SECRET")
@@ -22,8 +55,49 @@ if not JWT_SECRET:
 
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM")
 JWT_EXPIRE_MINUTES = int(os.getenv("JWT_EXPIRE_MINUTES"))
+# Admin checks trust the roles claim of the token; the user's roles_version
+# is re-read from the DB at most this often per worker (0 = every request)
+AUTH_ROLES_VERSION_TTL_SECONDS = float(
+    os.getenv("AUTH_ROLES_VERSION_TTL_SECONDS", "30")
+)
+# DB-backed user checks (get_current_user) cache the loaded user and roles
+AUTH_PRINCIPAL_TTL_SECONDS = float(os.getenv("AUTH_PRINCIPAL_TTL_SECONDS", "10"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+# bcrypt runs in a process pool; requests beyond workers + queue get 503
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+# Scheduling priority offset of the hashing processes (higher = yields CPU to the API)
+PASSWORD_HASH_NICENESS = int(os.getenv("PASSWORD_HASH_NICENESS", "10"))
+# Scheme for new hashes: "bcrypt" or "argon2" (argon2id, needs argon2-cffi).
+# Hashes of the other scheme or with a different cost are upgraded on login.
+# Tune the cost with app/scripts/bench_password_hash.py on the deployment CPU
+PASSWORD_HASH_SCHEMES = ("argon2", "bcrypt")
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt")
+if PASSWORD_HASH_SCHEME not in PASSWORD_HASH_SCHEMES:
+    raise ValueError(
+        f"PASSWORD_HASH_SCHEME must be one of {', '.join(PASSWORD_HASH_SCHEMES)}, "
+        f"got {PASSWORD_HASH_SCHEME!r}"
+    )
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+PASSWORD_ARGON2_TIME_COST = int(os.getenv("PASSWORD_ARGON2_TIME_COST", "2"))
+PASSWORD_ARGON2_MEMORY_KIB = int(os.getenv("PASSWORD_ARGON2_MEMORY_KIB", "19456"))
+PASSWORD_ARGON2_PARALLELISM = int(os.getenv("PASSWORD_ARGON2_PARALLELISM", "1"))
 
 # Media configuration
 MEDIA_ROOT = os.getenv("MEDIA_ROOT", "media")
 # Thumbnail square size in pixels
 THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "256"))
+
+# Catalog caches
+# Max age of the in-process category tree snapshot (other workers' writes)
+CATEGORY_TREE_TTL_SECONDS = float(os.getenv("CATEGORY_TREE_TTL_SECONDS", "60"))
+
+# Response cache for public catalog GETs: memory (per worker), redis or none
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Search
+# pg_trgm similarity threshold for fuzzy search (0..1, higher is stricter)
+SEARCH_SIMILARITY_THRESHOLD = float(os.getenv("SEARCH_SIMILARITY_THRESHOLD", "0.3"))
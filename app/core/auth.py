@@ -1,22 +1,26 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from types import SimpleNamespace
 import jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends, Header
-from sqlalchemy.orm import Session
-from typing import List
-from app.config import JWT_SECRET, JWT_ALGORITHM, JWT_EXPIRE_MINUTES
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import Any, Iterable, List, Optional, Tuple
+from app.config import (
+    AUTH_CACHE_MAX_ENTRIES,
+    AUTH_PRINCIPAL_TTL_SECONDS,
+    AUTH_ROLES_VERSION_TTL_SECONDS,
+    JWT_SECRET,
+    JWT_ALGORITHM,
+    JWT_EXPIRE_MINUTES,
+)
 from app import models
-from app.database import get_db
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+from app.core.hashing import hash_password, verify_password
+from app.core.metrics import register_collector
+from app.database import get_async_db, get_db
 
 
 def create_access_token(data: dict, expires_delta: int = None):
@@ -27,8 +31,17 @@ def create_access_token(data: dict, expires_delta: int = None):
 
 
 def decode_token(token: str) -> dict:
+    """Проверить подпись и срок токена и вернуть его claims.
+
+    Успешно проверенные токены запоминаются в token_cache до своего exp:
+    повторный запрос с тем же токеном не проверяет подпись заново.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    found, payload = token_cache.get(key)
+    if found:
+        return dict(payload)
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -38,38 +51,147 @@ def decode_token(token: str) -> dict:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Недействительный токен"
         )
-
-
-def get_current_user(token: str, db: Session):
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id = payload.get("user_id")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Недействительный токен",
-            )
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Срок действия токена истёк",
-        )
-    except jwt.PyJWTError:
+    exp = payload.get("exp")
+    ttl = exp - time.time() if isinstance(exp, (int, float)) else None
+    token_cache.set(key, payload, ttl)
+    return dict(payload)
+
+
+class TTLCache:
+    """LRU в памяти процесса: не больше max_entries записей, каждая живёт ttl секунд.
+
+    Используется для данных авторизации. Изменения в этом процессе сбрасывают
+    записи сразу (invalidate), изменения в других воркерах становятся видны
+    не позже чем через ttl.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # ключ -> (истекает в, значение)
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: Any) -> Tuple[bool, Any]:
+        """(найдено, значение); при отсутствии или истечении записи — (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop(key, None)
+                self._misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return True, entry[1]
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        """Запомнить значение; ttl записи, если задан, не больше ttl кэша"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + ttl, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[Any]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# sha256 токена -> claims проверенного токена; запись живёт до exp токена
+token_cache = TTLCache(JWT_EXPIRE_MINUTES * 60, AUTH_CACHE_MAX_ENTRIES)
+# user_id -> users.roles_version (None, если пользователя нет)
+roles_version_cache = TTLCache(AUTH_ROLES_VERSION_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES)
+# user_id -> Principal
+principal_cache = TTLCache(AUTH_PRINCIPAL_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES)
+register_collector("auth_token", token_cache.snapshot)
+register_collector("auth_roles_version", roles_version_cache.snapshot)
+register_collector("auth_principal", principal_cache.snapshot)
+
+
+def forget_users(user_ids: Iterable[int]) -> None:
+    """Сбросить кэши авторизации пользователей после изменения их ролей"""
+    user_ids = list(user_ids)
+    roles_version_cache.invalidate(user_ids)
+    principal_cache.invalidate(user_ids)
+
+
+class Principal:
+    """Снимок пользователя с ролями и профилем для проверок прав и /auth/me.
+
+    Не привязан к сессии и не делает ленивых запросов, поэтому его можно
+    хранить в principal_cache и отдавать в разные запросы.
+    """
+
+    def __init__(self, user: models.User):
+        self.id = user.id
+        self.email = user.email
+        self.created_at = user.created_at
+        self.updated_at = user.updated_at
+        self.roles = [_snapshot(user_role.role) for user_role in user.user_roles]
+        self.profile = _snapshot(user.profile) if user.profile else None
+
+    @property
+    def role_names(self) -> List[str]:
+        return [role.name for role in self.roles]
+
+
+def _snapshot(row) -> SimpleNamespace:
+    """Значения колонок строки ORM в отдельном объекте"""
+    return SimpleNamespace(
+        **{column.key: getattr(row, column.key) for column in row.__table__.columns}
+    )
+
+
+def get_current_user(token: str, db: Session) -> Principal:
+    user_id = decode_token(token).get("user_id")
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Недействительный токен"
         )
 
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
+    found, principal = principal_cache.get(user_id)
+    if not found:
+        # Роли и профиль — одним запросом на связь, без запроса на каждую роль
+        user = (
+            db.query(models.User)
+            .options(
+                selectinload(models.User.user_roles).joinedload(models.UserRole.role),
+                joinedload(models.User.profile),
+            )
+            .filter(models.User.id == user_id)
+            .first()
+        )
+        principal = Principal(user) if user else None
+        if principal is not None:
+            principal_cache.set(user_id, principal)
+    if principal is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден"
         )
-    return user
+    return principal
 
 
 def get_current_user_dep(
     authorization: str = Header(None), db: Session = Depends(get_db)
-):
+) -> Principal:
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -89,10 +211,46 @@ def get_current_payload_dep(authorization: str = Header(None)) -> dict:
     return decode_token(token)
 
 
+def get_roles_version(db: Session, user_id: int) -> Optional[int]:
+    """Текущая версия ролей пользователя или None, если его нет"""
+    row = db.query(models.User.roles_version).filter(models.User.id == user_id).first()
+    return row[0] if row is not None else None
+
+
+async def get_token_principal(
+    payload: dict = Depends(get_current_payload_dep),
+    db: AsyncSession = Depends(get_async_db),
+) -> dict:
+    """Payload токена, роли которого всё ещё актуальны.
+
+    Проверка доверяет claim roles, но токен, выданный до изменения ролей
+    (или удаления пользователя), должен перестать работать: версия из claim rv
+    сравнивается с users.roles_version. Пользователь и его роли из базы не
+    загружаются: при попадании в кэш версий запросов к базе нет совсем,
+    при промахе — один SELECT по первичному ключу.
+    """
+    user_id = payload.get("user_id")
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Недействительный токен"
+        )
+    found, version = roles_version_cache.get(user_id)
+    if not found:
+        version = await db.run_sync(get_roles_version, user_id)
+        roles_version_cache.set(user_id, version)
+    # Токены, выданные до появления claim rv, соответствуют версии 0
+    if version is None or version != payload.get("rv", 0):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Роли пользователя изменились, выполните вход заново",
+        )
+    return payload
+
+
 def require_role(role_name: str):
     """Зависимость для проверки конкретной роли (по БД)."""
 
-    def role_checker(current_user: models.User = Depends(get_current_user_dep)):
+    def role_checker(current_user: Principal = Depends(get_current_user_dep)):
         if not any(role.name == role_name for role in current_user.roles):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -106,7 +264,7 @@ def require_role(role_name: str):
 def require_roles(role_names: List[str]):
     """Зависимость для проверки наличия хотя бы одной из ролей (по БД)."""
 
-    def role_checker(current_user: models.User = Depends(get_current_user_dep)):
+    def role_checker(current_user: Principal = Depends(get_current_user_dep)):
         user_roles = {role.name for role in current_user.roles}
         if not any(role in user_roles for role in role_names):
             raise HTTPException(
@@ -119,9 +277,9 @@ def require_roles(role_names: List[str]):
 
 
 def require_role_from_token(role_name: str):
-    """Зависимость для проверки роли по данным из токена (без запроса к БД)."""
+    """Зависимость для проверки роли по данным из токена (без загрузки ролей из БД)."""
 
-    def role_checker(payload: dict = Depends(get_current_payload_dep)):
+    def role_checker(payload: dict = Depends(get_token_principal)):
         token_roles = payload.get("roles", [])
         if role_name not in token_roles:
             raise HTTPException(
@@ -134,9 +292,9 @@ def require_role_from_token(role_name: str):
 
 
 def require_roles_from_token(role_names: List[str]):
-    """Зависимость для проверки наличия хотя бы одной из ролей по токену (без запроса к БД)."""
+    """Зависимость для проверки наличия хотя бы одной из ролей по токену (без загрузки ролей из БД)."""
 
-    def role_checker(payload: dict = Depends(get_current_payload_dep)):
+    def role_checker(payload: dict = Depends(get_token_principal)):
         token_roles = payload.get("roles", [])
         if not any(role in token_roles for role in role_names):
             raise HTTPException(
@@ -148,11 +306,15 @@ def require_roles_from_token(role_names: List[str]):
     return role_checker
 
 
-def require_admin_role(current_user: models.User = Depends(get_current_user_dep)):
-    """Зависимость для проверки прав администратора"""
-    if not any(role.name == "admin" for role in current_user.roles):
+def require_admin_role(payload: dict = Depends(get_token_principal)):
+    """Зависимость для проверки прав администратора по токену.
+
+    Возвращает payload токена, а не пользователя: пользователь и его роли
+    из базы не загружаются.
+    """
+    if "admin" not in payload.get("roles", []):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Необходимы права администратора",
         )
-    return current_user
+    return payload
@@ -0,0 +1,245 @@
+"""
+Кэш сериализованных ответов публичных GET-эндпоинтов каталога.
+
+Тело ответа (JSON) хранится по ключу «путь + отсортированные параметры
+запроса» вместе с тегами. Изменяющие эндпоинты сбрасывают записи по тегам:
+`product:{id}`, `category:{id}`, `product_type:{id}`, `categories`,
+`product_types`.
+
+Бэкенды: LRU в памяти процесса с TTL (по умолчанию) и Redis (общий для всех
+процессов, нужен пакет redis). Кэш в памяти у каждого воркера свой: запись,
+обработанная другим воркером, видна здесь не позже чем через TTL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+
+from app.config import (
+    REDIS_URL,
+    RESPONSE_CACHE_BACKEND,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_TTL_SECONDS,
+)
+from app.core.metrics import register_collector
+from app.core.serialization import serialize
+
+
+class MemoryBackend:
+    """LRU в памяти процесса: не больше max_entries записей, у каждой свой срок"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # ключ -> (истекает в, тело, теги)
+        self._entries: "OrderedDict[str, Tuple[float, bytes, Tuple[str, ...]]]" = (
+            OrderedDict()
+        )
+        self._tags: Dict[str, Set[str]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    async def set(self, key: str, body: bytes, ttl: float, tags: Iterable[str]):
+        tags = tuple(tags)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, body, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    async def delete_tags(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Redis (или совместимый сервер): тело — строка с TTL, тег — множество ключей"""
+
+    def __init__(self, client, prefix: str = "catalog:"):
+        self.client = client
+        self.prefix = prefix
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, body: bytes, ttl: float, tags: Iterable[str]):
+        seconds = max(int(ttl), 1)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.set(self.prefix + key, body, ex=seconds)
+            for tag in tags:
+                # Множество тега живёт не меньше самой поздней своей записи
+                pipe.sadd(self._tag_key(tag), self.prefix + key)
+                pipe.expire(self._tag_key(tag), seconds)
+            await pipe.execute()
+
+    async def delete_tags(self, tags: Iterable[str]) -> None:
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        if not tag_keys:
+            return
+        keys = await self.client.sunion(*tag_keys)
+        await self.client.delete(*keys, *tag_keys)
+
+
+class DisabledBackend:
+    """Кэш выключен: ничего не хранит"""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: str, body: bytes, ttl: float, tags: Iterable[str]):
+        pass
+
+    async def delete_tags(self, tags: Iterable[str]) -> None:
+        pass
+
+
+class ResponseCache:
+    """Кэш ответов поверх бэкенда.
+
+    Использование в обработчике:
+        cached = await response_cache.get(request)
+        if cached is not None:
+            return cached
+        ...
+        return await response_cache.store(
+            request, ProductOut, product, tags=[f"product:{product.id}"]
+        )
+    """
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        # Счётчик инвалидаций: ответ, собранный до записи, не должен попасть
+        # в кэш после неё (иначе устаревшие данные проживут весь TTL)
+        self._generation = 0
+
+    @staticmethod
+    def key(request: Request, variant: str = "") -> str:
+        """Ключ записи. variant — версия данных (ETag): при новой версии
+        запись другого воркера со старым телом просто не найдётся"""
+        query = urlencode(sorted(request.query_params.multi_items()))
+        return f"{request.scope['path']}?{query}#{variant}"
+
+    async def get(
+        self,
+        request: Request,
+        variant: str = "",
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Optional[Response]:
+        """Ответ из кэша или None (тогда ответ нужно собрать и передать в store)"""
+        request.state.cache_generation = self._generation
+        body = await self.backend.get(self.key(request, variant))
+        with self._lock:
+            if body is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        if body is None:
+            return None
+        return Response(
+            body,
+            media_type="application/json",
+            headers={**(headers or {}), "X-Cache": "HIT"},
+        )
+
+    async def store(
+        self,
+        request: Request,
+        response_type,
+        data: Any,
+        tags: Iterable[str],
+        variant: str = "",
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Response:
+        """Сериализовать ответ, сохранить в кэш и вернуть его"""
+        body = serialize(response_type, data)
+        if getattr(request.state, "cache_generation", None) == self._generation:
+            await self.backend.set(self.key(request, variant), body, self.ttl, tags)
+        return Response(
+            body,
+            media_type="application/json",
+            headers={**(headers or {}), "X-Cache": "MISS"},
+        )
+
+    async def invalidate(self, *tags: str) -> None:
+        """Сбросить все ответы с любым из тегов"""
+        with self._lock:
+            self._generation += 1
+        await self.backend.delete_tags(tags)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses = self._hits, self._misses
+        total = hits + misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+        }
+
+
+def create_backend(name: str):
+    """Бэкенд по имени из RESPONSE_CACHE_BACKEND: memory, redis или none"""
+    if name == "memory":
+        return MemoryBackend(RESPONSE_CACHE_MAX_ENTRIES)
+    if name == "redis":
+        from redis.asyncio import Redis
+
+        return RedisBackend(Redis.from_url(REDIS_URL))
+    if name == "none":
+        return DisabledBackend()
+    raise ValueError(f"Неизвестный бэкенд кэша ответов: {name}")
+
+
+def product_tags(product) -> list:
+    """Теги карточки товара: сам товар, его категория и тип товара категории"""
+    tags = [f"product:{product.id}"]
+    if product.category_id is not None:
+        tags.append(f"category:{product.category_id}")
+        if product.category is not None and product.category.product_type_id:
+            tags.append(f"product_type:{product.category.product_type_id}")
+    return tags
+
+
+response_cache = ResponseCache(
+    create_backend(RESPONSE_CACHE_BACKEND), RESPONSE_CACHE_TTL_SECONDS
+)
+register_collector("response_cache", response_cache.snapshot)
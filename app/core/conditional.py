@@ -0,0 +1,100 @@
+"""
+Условные HTTP-запросы: ETag, Last-Modified и ответ 304 Not Modified
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts: Any) -> str:
+    """Сильный ETag из версий данных ответа (id, updated_at связанных строк).
+
+    Тело ответа для этого не нужно: версия проверяется до загрузки
+    и сериализации.
+    """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def collection_etag(versions, *parts: Any) -> str:
+    """ETag списка: количество элементов, max(updated_at) и версии элементов.
+
+    versions — кортежи (id, updated_at, ...) в порядке выдачи. Количество и
+    порядок id меняются при удалении или сдвиге страницы, max(updated_at) —
+    при изменении любого элемента. parts — то, от чего ещё зависит тело
+    (например, набор полей ответа).
+    """
+    versions = list(versions)
+    latest = max((v[1] for v in versions if v[1] is not None), default=None)
+    return make_etag(len(versions), latest, versions, *parts)
+
+
+def latest(*timestamps: Optional[datetime]) -> Optional[datetime]:
+    """Самое позднее из известных времён изменения"""
+    return max((ts for ts in timestamps if ts is not None), default=None)
+
+
+def validator_headers(
+    etag: str, last_modified: Optional[datetime] = None
+) -> Dict[str, str]:
+    """Заголовки валидаторов. no-cache: клиент хранит ответ, но перепроверяет его"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(
+            last_modified.astimezone(timezone.utc), usegmt=True
+        )
+    return headers
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime] = None
+) -> bool:
+    """Актуальна ли копия клиента (If-None-Match важнее If-Modified-Since)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Для If-None-Match сравнение слабое: W/"x" совпадает с "x"
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # Дата в заголовке с точностью до секунды
+    return last_modified.replace(microsecond=0) <= since
+
+
+def not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime] = None
+) -> Optional[Response]:
+    """Ответ 304 с валидаторами, если копия клиента актуальна, иначе None"""
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=validator_headers(etag, last_modified))
+    return None
+
+
+def check_conditional(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+) -> Optional[Response]:
+    """То же, что not_modified, но для обычного ответа проставляет валидаторы
+    в response обработчика"""
+    unchanged = not_modified(request, etag, last_modified)
+    if unchanged is None:
+        response.headers.update(validator_headers(etag, last_modified))
+    return unchanged
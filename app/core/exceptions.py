@@ -44,3 +44,14 @@ class BusinessLogicError(HTTPException):
 
     def __init__(self, detail: str):
         super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+class ServiceUnavailableError(HTTPException):
+    """Сервис временно перегружен: клиенту стоит повторить запрос позже"""
+
+    def __init__(self, detail: str, retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
@@ -0,0 +1,195 @@
+"""
+Хеширование паролей (bcrypt или argon2id) в отдельном пуле процессов.
+
+Один вызов bcrypt — сотни миллисекунд CPU. В обработчике он занимает поток
+и процессор воркера, и всплеск входов замедляет чтение каталога в том же
+процессе. PasswordHasher выполняет хеширование в ограниченном пуле процессов,
+а при переполнении очереди сразу отвечает 503, а не копит ожидающие запросы.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+from app.config import (
+    PASSWORD_ARGON2_MEMORY_KIB,
+    PASSWORD_ARGON2_PARALLELISM,
+    PASSWORD_ARGON2_TIME_COST,
+    PASSWORD_BCRYPT_ROUNDS,
+    PASSWORD_HASH_MAX_QUEUE,
+    PASSWORD_HASH_NICENESS,
+    PASSWORD_HASH_SCHEME,
+    PASSWORD_HASH_SCHEMES,
+    PASSWORD_HASH_WORKERS,
+)
+from app.core.exceptions import ServiceUnavailableError
+from app.core.metrics import register_collector
+
+# Новые хеши — по схеме PASSWORD_HASH_SCHEME. Остальные схемы только
+# проверяются (deprecated="auto"), а хеши с другой стоимостью тоже считаются
+# устаревшими: rounds задаёт и минимальную, и максимальную желаемую стоимость
+pwd_context = CryptContext(
+    schemes=[
+        PASSWORD_HASH_SCHEME,
+        *(name for name in PASSWORD_HASH_SCHEMES if name != PASSWORD_HASH_SCHEME),
+    ],
+    deprecated="auto",
+    bcrypt__rounds=PASSWORD_BCRYPT_ROUNDS,
+    argon2__type="ID",
+    argon2__rounds=PASSWORD_ARGON2_TIME_COST,
+    argon2__memory_cost=PASSWORD_ARGON2_MEMORY_KIB,
+    argon2__parallelism=PASSWORD_ARGON2_PARALLELISM,
+)
+# Схема без бэкенда (argon2 без пакета argon2-cffi) — ошибка при запуске,
+# а не отказ каждого входа
+pwd_context.handler().get_backend()
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Проверить пароль; для устаревшего хеша вернуть и новый хеш"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def _lower_priority(niceness: int) -> None:
+    """Инициализатор процесса пула: планировщик ОС отдаёт CPU запросам API раньше"""
+    if niceness:
+        os.nice(niceness)
+
+
+def _timed(fn, *args) -> Tuple[Any, float]:
+    """Выполнить fn в процессе пула и вернуть результат и время выполнения"""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+class PasswordHasher:
+    """Ограниченный пул процессов для хеширования паролей.
+
+    Одновременно принимается не больше workers + max_queue операций: workers
+    выполняются, остальные ждут в очереди пула. Следующая операция сразу
+    получает ServiceUnavailableError (503 с Retry-After).
+    """
+
+    def __init__(self, workers: int, max_queue: int, niceness: int = 0):
+        self.workers = workers
+        self.max_pending = workers + max_queue
+        self.niceness = niceness
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._rehashed = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._run_total = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Пул создаётся при первом входе, а не при импорте (скрипты, миграции).
+        # spawn: дочерний процесс не наследует потоки и соединения воркера
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_lower_priority,
+                    initargs=(self.niceness,),
+                )
+            return self._executor
+
+    async def _submit(self, fn, *args) -> Any:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise ServiceUnavailableError(
+                    "Сервер перегружен запросами входа, повторите попытку позже"
+                )
+            self._pending += 1
+        started = time.perf_counter()
+        executor = self._get_executor()
+        try:
+            result, run_seconds = await asyncio.get_running_loop().run_in_executor(
+                executor, _timed, fn, *args
+            )
+        except BrokenProcessPool:
+            # Процесс пула аварийно завершился: следующий вызов создаст новый пул
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+        latency = time.perf_counter() - started
+        with self._lock:
+            self._completed += 1
+            self._latency_total += latency
+            self._latency_max = max(self._latency_max, latency)
+            self._run_total += run_seconds
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        is_valid, new_hash = await self._submit(
+            verify_and_update, plain_password, hashed_password
+        )
+        if new_hash is not None:
+            with self._lock:
+                self._rehashed += 1
+        return is_valid, new_hash
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Очередь и задержка: latency — от запроса до результата, run — сам хеш.
+
+        rehashed — сколько хешей при входе оказались устаревшими и пересчитаны.
+        """
+        with self._lock:
+            completed = self._completed
+            return {
+                "workers": self.workers,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "completed": completed,
+                "rejected": self._rejected,
+                "rehashed": self._rehashed,
+                "latency_avg_ms": (
+                    round(self._latency_total / completed * 1000, 3)
+                    if completed
+                    else 0.0
+                ),
+                "latency_max_ms": round(self._latency_max * 1000, 3),
+                "run_avg_ms": (
+                    round(self._run_total / completed * 1000, 3) if completed else 0.0
+                ),
+            }
+
+
+password_hasher = PasswordHasher(
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE, PASSWORD_HASH_NICENESS
+)
+register_collector("password_hasher", password_hasher.snapshot)
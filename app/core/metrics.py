@@ -0,0 +1,18 @@
+"""
+Метрики процесса для эндпоинта /metrics
+"""
+
+from typing import Any, Callable, Dict
+
+# Имя раздела -> функция, возвращающая текущие значения
+_collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_collector(name: str, collector: Callable[[], Dict[str, Any]]) -> None:
+    """Зарегистрировать источник метрик под именем раздела"""
+    _collectors[name] = collector
+
+
+def collect() -> Dict[str, Any]:
+    """Снимок всех зарегистрированных метрик"""
+    return {name: collector() for name, collector in _collectors.items()}
@@ -0,0 +1,100 @@
+"""
+Курсорная (keyset) пагинация
+"""
+
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+# Заголовок ответа, в котором возвращается курсор следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def parse_sort(sort: str, sort_columns: Dict[str, Any]) -> Tuple[str, bool]:
+    """Разобрать параметр сортировки вида `price` или `-price`"""
+    descending = sort.startswith("-")
+    key = sort[1:] if descending else sort
+    if key not in sort_columns:
+        raise ValueError(
+            f"Недопустимое поле сортировки '{key}'. "
+            f"Допустимые значения: {', '.join(sort_columns)}"
+        )
+    return key, descending
+
+
+def encode_cursor(sort: str, values: List[Any]) -> str:
+    """Закодировать позицию (значение ключа сортировки, id) в непрозрачный курсор"""
+    payload = json.dumps(
+        {"s": sort, "v": [v if isinstance(v, (int, str)) else str(v) for v in values]},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, sort_columns: Dict[str, Any]) -> List[Any]:
+    """Раскодировать курсор и привести значения к типам колонок"""
+    key, _ = parse_sort(sort, sort_columns)
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        cursor_sort, values = payload["s"], payload["v"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Некорректный курсор пагинации")
+
+    if cursor_sort != sort:
+        raise ValueError("Курсор получен для другой сортировки")
+
+    columns = _cursor_columns(key, sort_columns)
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError("Некорректный курсор пагинации")
+    try:
+        return [col.type.python_type(v) for col, v in zip(columns, values)]
+    except (ValueError, TypeError, ArithmeticError):
+        raise ValueError("Некорректный курсор пагинации")
+
+
+def apply_keyset(
+    query: Query,
+    sort: str,
+    sort_columns: Dict[str, Any],
+    cursor: Optional[str] = None,
+) -> Query:
+    """Добавить к запросу детерминированную сортировку (ключ, id) и условие seek"""
+    key, descending = parse_sort(sort, sort_columns)
+    columns = _cursor_columns(key, sort_columns)
+
+    if cursor is not None:
+        values = decode_cursor(cursor, sort, sort_columns)
+        if len(columns) == 1:
+            left, right = columns[0], values[0]
+        else:
+            left, right = tuple_(*columns), tuple_(*values)
+        query = query.filter(left < right if descending else left > right)
+
+    return query.order_by(
+        *[col.desc() if descending else col.asc() for col in columns]
+    )
+
+
+def next_cursor(
+    items: List[Any], sort: str, sort_columns: Dict[str, Any], limit: int
+) -> Optional[str]:
+    """Курсор следующей страницы или None, если страница неполная"""
+    if len(items) < limit or not items:
+        return None
+    key, _ = parse_sort(sort, sort_columns)
+    last = items[-1]
+    columns = _cursor_columns(key, sort_columns)
+    return encode_cursor(sort, [getattr(last, col.key) for col in columns])
+
+
+def _cursor_columns(key: str, sort_columns: Dict[str, Any]) -> List[Any]:
+    """Колонки курсора: ключ сортировки и первичный ключ как tie-breaker"""
+    column = sort_columns[key]
+    if key == "id":
+        return [column]
+    return [column, sort_columns["id"]]
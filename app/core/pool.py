@@ -0,0 +1,70 @@
+"""
+Пул соединений с измерением ожидания выдачи соединения
+"""
+
+import threading
+import time
+from typing import Any, Dict, Type
+
+from sqlalchemy import exc
+from sqlalchemy.pool import Pool
+
+
+class PoolMetrics:
+    """Накопленная статистика выдачи соединений из пула"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def observe(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += int(timed_out)
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self, pool: Pool) -> Dict[str, Any]:
+        """Текущее состояние пула и статистика ожидания"""
+        with self._lock:
+            checkouts, timeouts = self.checkouts, self.timeouts
+            wait_total, wait_max = self.wait_total, self.wait_max
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            # overflow() отрицателен, пока открыто меньше pool_size соединений
+            "overflow": max(pool.overflow(), 0),
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "wait_avg_ms": (
+                round(wait_total / checkouts * 1000, 3) if checkouts else 0.0
+            ),
+            "wait_max_ms": round(wait_max * 1000, 3),
+        }
+
+
+def timed_pool_class(base: Type[Pool], metrics: PoolMetrics) -> Type[Pool]:
+    """Подкласс пула, измеряющий время получения соединения (ожидание
+    свободного соединения и установку нового).
+
+    Метрики хранятся в атрибуте класса, поэтому переживают пересоздание пула
+    (Pool.recreate() создаёт экземпляр того же класса).
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = base._do_get(self)
+        except exc.TimeoutError:
+            self.metrics.observe(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.observe(time.perf_counter() - started)
+        return connection
+
+    return type(
+        f"Timed{base.__name__}", (base,), {"metrics": metrics, "_do_get": _do_get}
+    )
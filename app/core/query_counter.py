@@ -0,0 +1,49 @@
+"""
+Подсчёт SQL-запросов, отправленных в базу (для тестов и бенчмарков)
+"""
+
+from typing import List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryCounter:
+    """Контекстный менеджер, считающий запросы, выполненные через движки.
+
+    Без аргументов слушает все движки приложения: синхронный (скрипты, crud
+    напрямую), асинхронный, через который обработчики API выполняют crud
+    (run_sync), и реплику, если она настроена. Поэтому считаются и запросы,
+    сделанные через роутеры.
+
+    Пример:
+        with QueryCounter() as counter:
+            client.get(f"/products/{product_id}")
+        assert counter.count == 1
+    """
+
+    def __init__(self, *binds: Engine):
+        if not binds:
+            from app.database import async_engine, async_replica_engine, engine
+
+            binds = (engine, async_engine.sync_engine)
+            if async_replica_engine is not None:
+                binds += (async_replica_engine.sync_engine,)
+        self.binds = binds
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        for bind in self.binds:
+            event.listen(bind, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        for bind in self.binds:
+            event.remove(bind, "before_cursor_execute", self._on_execute)
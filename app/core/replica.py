@@ -0,0 +1,129 @@
+"""
+Маршрутизация чтения на реплику: контроль отставания реплики и чтение
+после записи с основного сервера
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Кука с временем последней записи клиента: запросы других процессов
+# в течение окна чтения после записи тоже пойдут на основной сервер
+LAST_WRITE_COOKIE = "db_last_write"
+
+# Отставание в секундах. Если реплика догнала весь полученный WAL, отставание
+# нулевое, даже когда основной сервер давно не писал (иначе now() -
+# pg_last_xact_replay_timestamp() растёт на простаивающей базе)
+LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+    """)
+
+# Проверка недоступной реплики не должна задерживать запрос надолго
+LAG_CHECK_TIMEOUT_SECONDS = 2.0
+
+
+class ReplicaRouter:
+    """Решает, можно ли читать с реплики.
+
+    Чтение уходит на основной сервер, если:
+    - отставание реплики больше max_lag или реплика недоступна;
+    - клиент (кука) или этот процесс писали в базу меньше read_after_write
+      секунд назад. Окно процесса нужно для кэшей в памяти: после
+      инвалидации они не должны пересобраться по отстающей реплике.
+
+    Отставание проверяется не чаще раза в check_interval секунд. Пока идёт
+    проверка, остальные запросы используют предыдущий результат.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        max_lag: float,
+        check_interval: float,
+        read_after_write: float,
+    ):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.read_after_write = read_after_write
+        self._lag: Optional[float] = None
+        self._checked_at = float("-inf")
+        self._check_lock = asyncio.Lock()
+        self._last_write = float("-inf")
+        self._counts_lock = threading.Lock()
+        self._replica_reads = 0
+        self._primary_reads = 0
+
+    def mark_write(self, response: Response) -> None:
+        """Запомнить запись: чтения этого клиента и процесса идут на основной сервер"""
+        self._last_write = time.monotonic()
+        response.set_cookie(
+            LAST_WRITE_COOKIE,
+            str(time.time()),
+            max_age=max(int(self.read_after_write), 1),
+            httponly=True,
+            samesite="lax",
+        )
+
+    def _recently_written(self, request: Request) -> bool:
+        if time.monotonic() - self._last_write < self.read_after_write:
+            return True
+        try:
+            written_at = float(request.cookies.get(LAST_WRITE_COOKIE, ""))
+        except ValueError:
+            return False
+        return time.time() - written_at < self.read_after_write
+
+    async def _measure_lag(self) -> float:
+        async with self.engine.connect() as conn:
+            return float((await conn.execute(LAG_QUERY)).scalar())
+
+    async def _refresh_lag(self) -> None:
+        try:
+            self._lag = await asyncio.wait_for(
+                self._measure_lag(), LAG_CHECK_TIMEOUT_SECONDS
+            )
+        except Exception:
+            # Реплика недоступна: читаем с основного сервера до следующей проверки
+            self._lag = None
+        finally:
+            self._checked_at = time.monotonic()
+
+    async def _replica_usable(self) -> bool:
+        stale = time.monotonic() - self._checked_at >= self.check_interval
+        if stale and not self._check_lock.locked():
+            async with self._check_lock:
+                await self._refresh_lag()
+        return self._lag is not None and self._lag <= self.max_lag
+
+    async def use_replica(self, request: Request) -> bool:
+        """Отправить ли чтение этого запроса на реплику"""
+        use = not self._recently_written(request) and await self._replica_usable()
+        with self._counts_lock:
+            if use:
+                self._replica_reads += 1
+            else:
+                self._primary_reads += 1
+        return use
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Текущее отставание и распределение чтений"""
+        with self._counts_lock:
+            replica_reads, primary_reads = self._replica_reads, self._primary_reads
+        return {
+            "lag_seconds": self._lag,
+            "max_lag_seconds": self.max_lag,
+            "replica_reads": replica_reads,
+            "primary_reads": primary_reads,
+        }
@@ -0,0 +1,39 @@
+"""
+Сериализация ответов через TypeAdapter Pydantic.
+
+Если обработчик возвращает ORM-объекты, FastAPI валидирует их по
+response_model, переводит в словари (jsonable) и кодирует стандартным json.
+Для списков из сотен товаров с фотографиями это основная часть времени
+запроса. json_response делает один проход валидации и сразу пишет JSON
+в байты на стороне pydantic-core; возвращённый Response FastAPI отдаёт
+как есть, без повторной проверки. response_model в декораторе остаётся
+для схемы OpenAPI.
+"""
+
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def _adapter(response_type) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+def serialize(response_type, data: Any) -> bytes:
+    """JSON ответа так же, как его построил бы FastAPI по response_model"""
+    adapter = _adapter(response_type)
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+
+def json_response(
+    response_type, data: Any, response: Optional[Response] = None
+) -> Response:
+    """Готовый JSON-ответ. response — внедрённый в обработчик Response:
+    его заголовки (ETag, X-Next-Cursor) переносятся в результат"""
+    result = Response(serialize(response_type, data), media_type="application/json")
+    if response is not None:
+        result.raw_headers.extend(response.raw_headers)
+    return result
@@ -0,0 +1,25 @@
+"""
+Нечёткий поиск на триграммах (расширение pg_trgm)
+"""
+
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import SEARCH_SIMILARITY_THRESHOLD
+
+
+def set_similarity_threshold(db: Session, threshold: Optional[float] = None) -> None:
+    """Установить порог похожести для операторов `%` и `<%`.
+
+    Значение действует до конца текущей транзакции (аналог SET LOCAL),
+    поэтому не влияет на другие запросы из пула соединений.
+    """
+    value = str(SEARCH_SIMILARITY_THRESHOLD if threshold is None else threshold)
+    db.execute(
+        select(
+            func.set_config("pg_trgm.similarity_threshold", value, True),
+            func.set_config("pg_trgm.word_similarity_threshold", value, True),
+        )
+    )
@@ -1,8 +1,19 @@
+from sqlalchemy import Numeric, and_, cast, func, true, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, array
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from app.models.carpet import Carpet
+from app.models.product import Product
+from app.crud.product import touch_product
 from app.schemas.carpet import CarpetCreate, CarpetUpdate
-from typing import Optional, List
+from app.core.trigram import set_similarity_threshold
+from typing import Any, Dict, Optional, List
+
+# Границы корзин фасетов: ширина и длина в метрах, цена в валюте каталога.
+# Корзина i покрывает [BUCKETS[i-1], BUCKETS[i]), крайние корзины открыты
+WIDTH_BUCKETS = (1, 2, 3, 4)
+LENGTH_BUCKETS = (1, 2, 3, 4, 5)
+PRICE_BUCKETS = (10_000, 25_000, 50_000, 100_000, 250_000)
 
 
 def get_carpet(db: Session, carpet_id: int) -> Optional[Carpet]:
@@ -33,10 +44,13 @@ def get_carpets(db: Session, skip: int = 0, limit: int = 100) -> List[Carpet]:
 
 
 def search_carpets_by_material(
-    db: Session, material: str, skip: int = 0, limit: int = 100
+    db: Session, material: str, skip: int = 0, limit: int = 100, fuzzy: bool = False
 ) -> List[Carpet]:
-    """Поиск ковров по материалу"""
+    """Поиск ковров по материалу; при fuzzy=True — нечёткий поиск
+    по триграммам с сортировкой по похожести"""
     try:
+        if fuzzy:
+            return _search_carpets_fuzzy(db, Carpet.material, material, skip, limit)
         return (
             db.query(Carpet)
             .filter(Carpet.material.ilike(f"%{material}%"))
@@ -50,10 +64,13 @@ def search_carpets_by_material(
 
 
 def search_carpets_by_origin(
-    db: Session, origin: str, skip: int = 0, limit: int = 100
+    db: Session, origin: str, skip: int = 0, limit: int = 100, fuzzy: bool = False
 ) -> List[Carpet]:
-    """Поиск ковров по происхождению"""
+    """Поиск ковров по происхождению; при fuzzy=True — нечёткий поиск
+    по триграммам с сортировкой по похожести"""
     try:
+        if fuzzy:
+            return _search_carpets_fuzzy(db, Carpet.origin, origin, skip, limit)
         return (
             db.query(Carpet)
             .filter(Carpet.origin.ilike(f"%{origin}%"))
@@ -66,11 +83,28 @@ def search_carpets_by_origin(
         raise e
 
 
+def _search_carpets_fuzzy(
+    db: Session, column, value: str, skip: int, limit: int
+) -> List[Carpet]:
+    """Ковры, у которых значение колонки похоже на value (оператор pg_trgm `%`)"""
+    set_similarity_threshold(db)
+    return (
+        db.query(Carpet)
+        .filter(column.op("%")(value))
+        .order_by(func.similarity(column, value).desc(), Carpet.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+
 def create_carpet(db: Session, carpet: CarpetCreate) -> Carpet:
     """Создать новый ковер"""
     try:
         db_carpet = Carpet(**carpet.model_dump())
         db.add(db_carpet)
+        # Ковёр — часть карточки товара (extended_info)
+        touch_product(db, db_carpet.product_id)
         db.commit()
         db.refresh(db_carpet)
         return db_carpet
@@ -95,6 +129,7 @@ def update_carpet(
         for field, value in update_data.items():
             setattr(db_carpet, field, value)
 
+        touch_product(db, db_carpet.product_id)
         db.commit()
         db.refresh(db_carpet)
         return db_carpet
@@ -111,6 +146,7 @@ def delete_carpet(db: Session, carpet_id: int) -> bool:
     try:
         db_carpet = get_carpet(db, carpet_id)
         if db_carpet:
+            touch_product(db, db_carpet.product_id)
             db.delete(db_carpet)
             db.commit()
             return True
@@ -142,7 +178,160 @@ def get_carpets_by_size_range(
         if max_length is not None:
             query = query.filter(Carpet.length <= max_length)
 
-        return query.offset(skip).limit(limit).all()
+        # Порядок индекса ix_carpets_width_length: диапазон читается по индексу,
+        # а страницы OFFSET/LIMIT стабильны
+        return (
+            query.order_by(Carpet.width, Carpet.length, Carpet.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
     except SQLAlchemyError as e:
         db.rollback()
         raise e
+
+
+def search_carpets_faceted(
+    db: Session,
+    materials: Optional[List[str]] = None,
+    origins: Optional[List[str]] = None,
+    min_width: Optional[float] = None,
+    max_width: Optional[float] = None,
+    min_length: Optional[float] = None,
+    max_length: Optional[float] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> Dict[str, Any]:
+    """Поиск ковров по любой комбинации фильтров с подсчётом фасетов.
+
+    Возвращает страницу ковров, общее количество и счётчики по материалу,
+    происхождению и корзинам ширины, длины и цены. Счётчики фасета учитывают
+    все фильтры, кроме фильтра самого фасета, чтобы в интерфейсе были видны
+    альтернативы уже выбранному значению. Все фасеты считаются одним запросом
+    с GROUPING SETS.
+    """
+    try:
+        conditions = {
+            "material": [Carpet.material.in_(materials)] if materials else [],
+            "origin": [Carpet.origin.in_(origins)] if origins else [],
+            "width": _range_conditions(Carpet.width, min_width, max_width),
+            "length": _range_conditions(Carpet.length, min_length, max_length),
+            "price": _range_conditions(Product.price, min_price, max_price),
+        }
+        all_conditions = [c for facet in conditions.values() for c in facet]
+
+        items = (
+            db.query(Carpet)
+            .join(Carpet.product)
+            .filter(*all_conditions)
+            .order_by(Carpet.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+        total, facets = _count_facets(db, conditions)
+        return {"total": total, "items": items, "facets": facets}
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+
+def _range_conditions(column, min_value, max_value) -> list:
+    conditions = []
+    if min_value is not None:
+        conditions.append(column >= min_value)
+    if max_value is not None:
+        conditions.append(column <= max_value)
+    return conditions
+
+
+def _bucket(column, bounds):
+    """Номер корзины значения: 0 — меньше первой границы, len(bounds) — не меньше последней"""
+    return func.width_bucket(column, cast(array(bounds), ARRAY(Numeric)))
+
+
+def _count_facets(db: Session, conditions: Dict[str, list]):
+    """Общее количество и фасеты: одна группировка GROUPING SETS по всем фасетам"""
+    bounds = {
+        "width": WIDTH_BUCKETS,
+        "length": LENGTH_BUCKETS,
+        "price": PRICE_BUCKETS,
+    }
+    # Подзапрос вычисляет ключи фасетов и флаги фильтров для каждой строки,
+    # чтобы внешний запрос группировал по колонкам, а не по выражениям
+    rows = (
+        db.query(
+            Carpet.material.label("material"),
+            Carpet.origin.label("origin"),
+            _bucket(Carpet.width, bounds["width"]).label("width"),
+            _bucket(Carpet.length, bounds["length"]).label("length"),
+            _bucket(Product.price, bounds["price"]).label("price"),
+            *[
+                and_(true(), *facet_conditions).label(f"{name}_match")
+                for name, facet_conditions in conditions.items()
+            ],
+        )
+        .join(Carpet.product)
+        .subquery()
+    )
+
+    keys = [rows.c[name] for name in conditions]
+    counts = [
+        func.count()
+        .filter(
+            and_(*[rows.c[f"{other}_match"] for other in conditions if other != name])
+        )
+        .label(f"{name}_count")
+        for name in conditions
+    ]
+    total = func.count().filter(and_(*[rows.c[f"{name}_match"] for name in conditions]))
+    # Отдельная группировка на каждый фасет и () — итог по всем строкам
+    grouped = (
+        db.query(
+            func.grouping(*keys).label("grouping_id"),
+            *keys,
+            *counts,
+            total.label("total"),
+        )
+        .group_by(func.grouping_sets(*keys, tuple_()))
+        .all()
+    )
+
+    # GROUPING(...) — битовая маска, единица означает «колонка не группируется»
+    all_bits = (1 << len(keys)) - 1
+    facet_by_mask = {
+        all_bits ^ (1 << (len(keys) - 1 - position)): name
+        for position, name in enumerate(conditions)
+    }
+
+    total_count = 0
+    facets: Dict[str, list] = {name: [] for name in conditions}
+    for row in grouped:
+        if row.grouping_id == all_bits:
+            total_count = row.total
+            continue
+        name = facet_by_mask[row.grouping_id]
+        value, count = getattr(row, name), getattr(row, f"{name}_count")
+        if value is None or not count:
+            continue
+        if name in bounds:
+            facet_bounds = bounds[name]
+            facets[name].append(
+                {
+                    "min": facet_bounds[value - 1] if value > 0 else None,
+                    "max": facet_bounds[value] if value < len(facet_bounds) else None,
+                    "count": count,
+                }
+            )
+        else:
+            facets[name].append({"value": value, "count": count})
+
+    for name, values in facets.items():
+        if name in bounds:
+            values.sort(key=lambda v: (v["min"] is not None, v["min"] or 0))
+        else:
+            values.sort(key=lambda v: (-v["count"], v["value"]))
+    return total_count, facets
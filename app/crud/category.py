@@ -1,7 +1,17 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import (
+    BigInteger,
+    delete,
+    insert,
+    literal,
+    select,
+    true,
+    union_all,
+)
+from sqlalchemy.orm import Session, aliased
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from app.models.category import Category
+from app.models.category import Category, CategoryClosure
 from app.schemas.category import CategoryCreate, CategoryUpdate, CategoryWithComputed
+from app.services.category_tree import category_tree_index
 from typing import Optional, List
 
 
@@ -41,6 +51,90 @@ def get_category_children(db: Session, category_id: int) -> List[Category]:
         raise e
 
 
+def get_category_breadcrumbs(db: Session, category_id: int) -> List[Category]:
+    """Получить цепочку категорий от корня до указанной (одним запросом)"""
+    try:
+        return (
+            db.query(Category)
+            .join(CategoryClosure, CategoryClosure.ancestor_id == Category.id)
+            .filter(CategoryClosure.descendant_id == category_id)
+            .order_by(CategoryClosure.depth.desc())
+            .all()
+        )
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+
+def is_descendant(db: Session, category_id: int, ancestor_id: int) -> bool:
+    """Является ли категория потомком (или самой) ancestor_id"""
+    return db.query(
+        db.query(CategoryClosure)
+        .filter(
+            CategoryClosure.ancestor_id == ancestor_id,
+            CategoryClosure.descendant_id == category_id,
+        )
+        .exists()
+    ).scalar()
+
+
+def _insert_closure_rows(db: Session, category_id: int, parent_id: Optional[int]):
+    """Добавить в таблицу замыкания новую категорию: строку на себя и на
+    каждого предка родителя"""
+    own_id = literal(category_id, BigInteger)
+    rows = select(own_id, own_id, literal(0))
+    if parent_id is not None:
+        rows = union_all(
+            rows,
+            select(
+                CategoryClosure.ancestor_id, own_id, CategoryClosure.depth + 1
+            ).where(CategoryClosure.descendant_id == parent_id),
+        )
+    db.execute(
+        insert(CategoryClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"], rows
+        )
+    )
+
+
+def _move_closure_subtree(
+    db: Session, category_id: int, new_parent_id: Optional[int]
+) -> None:
+    """Перенести поддерево категории под нового родителя в таблице замыкания"""
+    subtree = select(CategoryClosure.descendant_id).where(
+        CategoryClosure.ancestor_id == category_id
+    )
+    # Отвязываем поддерево от прежних предков
+    db.execute(
+        delete(CategoryClosure).where(
+            CategoryClosure.descendant_id.in_(subtree),
+            CategoryClosure.ancestor_id.not_in(subtree),
+        )
+    )
+    if new_parent_id is None:
+        return
+
+    # Привязываем каждый узел поддерева к каждому предку нового родителя
+    supertree = aliased(CategoryClosure)
+    sub = aliased(CategoryClosure)
+    db.execute(
+        insert(CategoryClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(
+                supertree.ancestor_id,
+                sub.descendant_id,
+                supertree.depth + sub.depth + 1,
+            )
+            .select_from(supertree)
+            .join(sub, true())
+            .where(
+                supertree.descendant_id == new_parent_id,
+                sub.ancestor_id == category_id,
+            ),
+        )
+    )
+
+
 def create_category(db: Session, category: CategoryCreate) -> Category:
     """Создать новую категорию"""
     try:
@@ -55,7 +149,10 @@ def create_category(db: Session, category: CategoryCreate) -> Category:
             parent_id=category.parent_id,
         )
         db.add(db_category)
+        db.flush()
+        _insert_closure_rows(db, db_category.id, db_category.parent_id)
         db.commit()
+        category_tree_index.invalidate()
         db.refresh(db_category)
 
         return db_category
@@ -78,24 +175,23 @@ def update_category(
 
         update_data = category.model_dump(exclude_unset=True)
 
-        if "parent_id" in update_data:
+        if (
+            "parent_id" in update_data
+            and update_data["parent_id"] != db_category.parent_id
+        ):
             new_parent_id = update_data["parent_id"]
-            if new_parent_id is not None:
-                current_parent_id = new_parent_id
-                while current_parent_id is not None:
-                    if current_parent_id == category_id:
-                        raise ValueError(
-                            "Обнаружена циклическая ссылка в иерархии категорий"
-                        )
-                    parent_category = get_category(db, current_parent_id)
-                    current_parent_id = (
-                        parent_category.parent_id if parent_category else None
-                    )
+            # Новый родитель не может лежать в поддереве самой категории
+            if new_parent_id is not None and is_descendant(
+                db, new_parent_id, category_id
+            ):
+                raise ValueError("Обнаружена циклическая ссылка в иерархии категорий")
+            _move_closure_subtree(db, category_id, new_parent_id)
 
         for field, value in update_data.items():
             setattr(db_category, field, value)
 
         db.commit()
+        category_tree_index.invalidate()
         db.refresh(db_category)
 
         return db_category
@@ -116,6 +212,7 @@ def delete_category(db: Session, category_id: int) -> bool:
 
         db.delete(db_category)
         db.commit()
+        category_tree_index.invalidate()
 
         return True
     except SQLAlchemyError as e:
@@ -150,36 +247,11 @@ def _build_category_tree_node(category, category_dict):
 def enrich_category_with_computed_fields(
     db: Session,
     category: Category,
-    all_categories: List[Category] = None,
     include_children: bool = True,
 ) -> CategoryWithComputed:
-    """Обогатить категорию вычисляемыми полями"""
-    if all_categories is None:
-        all_categories = db.query(Category).all()
-
-    children = [cat for cat in all_categories if cat.parent_id == category.id]
-    is_leaf = len(children) == 0
-
-    if include_children:
-        enriched_children = [
-            enrich_category_with_computed_fields(
-                db, child, all_categories, include_children
-            )
-            for child in children
-        ]
-    else:
-        enriched_children = []
-
-    return CategoryWithComputed(
-        id=category.id,
-        name=category.name,
-        product_type_id=category.product_type_id,
-        parent_id=category.parent_id,
-        created_at=category.created_at,
-        updated_at=category.updated_at,
-        is_leaf=is_leaf,
-        children=enriched_children,
-    )
+    """Обогатить категорию вычисляемыми полями (по индексу дерева)"""
+    tree = category_tree_index.get_containing(db, category.id)
+    return tree.to_schema(category.id, include_children=include_children)
 
 
 def enrich_categories_with_computed_fields(
@@ -187,8 +259,6 @@ def enrich_categories_with_computed_fields(
 ) -> List[CategoryWithComputed]:
     """Обогатить список категорий вычисляемыми полями"""
     return [
-        enrich_category_with_computed_fields(
-            db, cat, None, include_children=include_children
-        )
+        enrich_category_with_computed_fields(db, cat, include_children=include_children)
         for cat in categories
     ]
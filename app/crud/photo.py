@@ -3,6 +3,7 @@ from typing import List, Optional
 from sqlalchemy.orm import Session
 
 from app.models.product_photo import ProductPhoto
+from app.crud.product import touch_product
 
 
 def get_photos_by_product(db: Session, product_id: int) -> List[ProductPhoto]:
@@ -47,6 +48,7 @@ def create_photo(
         sort_order=sort_order,
     )
     db.add(photo)
+    touch_product(db, product_id)
     db.commit()
     db.refresh(photo)
     return photo
@@ -71,12 +73,14 @@ def update_photo(
     if sort_order is not None:
         photo.sort_order = sort_order
 
+    touch_product(db, photo.product_id)
     db.commit()
     db.refresh(photo)
     return photo
 
 
 def delete_photo(db: Session, photo: ProductPhoto) -> None:
+    touch_product(db, photo.product_id)
     db.delete(photo)
     db.commit()
 
@@ -90,4 +94,5 @@ def reorder_photos(db: Session, product_id: int, photo_ids: List[int]) -> None:
         )
         if p:
             p.sort_order = index
+    touch_product(db, product_id)
     db.commit()
@@ -1,8 +1,35 @@
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, literal, or_, select, union_all
+from sqlalchemy.orm import Session, joinedload, selectinload
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from app.models.product import Product
+from app.models.product import (
+    NAME_PREFIX_KEY,
+    SKU_PREFIX_KEY,
+    Product,
+    product_search_query,
+)
+from app.models.category import Category, CategoryClosure
+from app.models.product_type import ProductType
 from app.schemas.product import ProductCreate, ProductUpdate
-from typing import Optional, List
+from app.core.pagination import apply_keyset, parse_sort
+from app.core.trigram import set_similarity_threshold
+from app.services.product_extensions import ProductExtensionService
+from app.services.product_projection import ProductProjection
+from app.services.category_tree import category_tree_index
+from typing import Any, Optional, List, Sequence
+
+# Поля, по которым разрешена сортировка и курсорная пагинация списков товаров
+PRODUCT_SORT_COLUMNS = {
+    "id": Product.id,
+    "name": Product.name,
+    "price": Product.price,
+}
+
+# Связи списков товаров грузятся отдельными батчами `SELECT ... WHERE id IN (...)`,
+# а не JOIN-ом: joinedload коллекции вместе с LIMIT размножает строки по фото
+LISTING_LOAD_OPTIONS = (
+    selectinload(Product.photos),
+    selectinload(Product.category).selectinload(Category.product_type),
+)
 
 
 def get_product(db: Session, product_id: int) -> Optional[Product]:
@@ -10,7 +37,10 @@ def get_product(db: Session, product_id: int) -> Optional[Product]:
     try:
         return (
             db.query(Product)
-            .options(joinedload(Product.photos))
+            .options(
+                joinedload(Product.photos),
+                joinedload(Product.category).joinedload(Category.product_type),
+            )
             .filter(Product.id == product_id)
             .first()
         )
@@ -19,21 +49,68 @@ def get_product(db: Session, product_id: int) -> Optional[Product]:
         raise e
 
 
-def get_products(db: Session, skip: int = 0, limit: int = 100) -> List[Product]:
+def get_products(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    projection: Optional[ProductProjection] = None,
+) -> List[Product]:
     """Получить список товаров с пагинацией и фотографиями"""
     try:
-        return (
-            db.query(Product)
-            .options(joinedload(Product.photos))
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        return _paginate(db.query(Product), skip, limit, cursor, sort, projection)
     except SQLAlchemyError as e:
         db.rollback()
         raise e
 
 
+def get_product_version(db: Session, product_id: int):
+    """Версия карточки товара без загрузки самого товара (для ETag)"""
+    return _get_product_version(db, Product.id == product_id)
+
+
+def get_product_version_by_sku(db: Session, sku: str):
+    """Версия карточки товара по SKU без загрузки самого товара (для ETag)"""
+    return _get_product_version(db, Product.sku == sku)
+
+
+def _get_product_version(db: Session, criterion):
+    """Строка (id, updated_at, category_updated_at, product_type_updated_at) или None.
+
+    Карточка показывает название категории и sysname её типа товара, поэтому
+    версия включает время изменения обеих строк. Фото и ковёр при изменении
+    обновляют updated_at товара (см. touch_product).
+    """
+    try:
+        return db.execute(
+            select(
+                Product.id,
+                func.coalesce(Product.updated_at, Product.created_at).label(
+                    "updated_at"
+                ),
+                Category.updated_at.label("category_updated_at"),
+                ProductType.updated_at.label("product_type_updated_at"),
+            )
+            .outerjoin(Category, Product.category_id == Category.id)
+            .outerjoin(ProductType, Category.product_type_id == ProductType.id)
+            .where(criterion)
+        ).first()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+
+def touch_product(db: Session, product_id: int) -> None:
+    """Обновить updated_at товара при изменении его фото или расширения.
+
+    Не коммитит: вызывается внутри транзакции изменения.
+    """
+    db.query(Product).filter(Product.id == product_id).update(
+        {Product.updated_at: func.now()}, synchronize_session=False
+    )
+
+
 def get_product_by_sku(db: Session, sku: str) -> Optional[Product]:
     """Получить товар по SKU с фотографиями"""
     try:
@@ -50,84 +127,33 @@ def get_product_by_sku(db: Session, sku: str) -> Optional[Product]:
 
 def get_product_with_extended_info(db: Session, product_id: int) -> Optional[Product]:
     """Получить товар по ID с дополнительной информацией и фотографиями"""
-    try:
-        from app.models.category import Category
-        from app.models.carpet import Carpet
-        from app.services.product_extensions import ProductExtensionService
-
-        query = (
-            db.query(Product)
-            .options(
-                joinedload(Product.photos),
-                joinedload(Product.category).joinedload(Category.product_type),
-            )
-            .filter(Product.id == product_id)
-        )
-
-        # Определяем тип товара для правильного join
-        product = query.first()
-        if not product:
-            return None
-
-        # Получаем sysname типа товара
-        product_type_sysname = (
-            product.category.product_type.sysname
-            if product.category and product.category.product_type
-            else None
-        )
-
-        # Если это ковер, делаем join с таблицей Carpet
-        if product_type_sysname == "carpet":
-            query = query.outerjoin(Carpet, Product.id == Carpet.product_id)
-            product = query.first()
-
-        # Добавляем extended_info
-        product.extended_info = ProductExtensionService.get_extended_info(
-            product, product_type_sysname
-        )
-
-        return product
-    except SQLAlchemyError as e:
-        db.rollback()
-        raise e
+    return _get_product_with_extended_info(db, Product.id == product_id)
 
 
 def get_product_by_sku_with_extended_info(db: Session, sku: str) -> Optional[Product]:
     """Получить товар по SKU с дополнительной информацией и фотографиями"""
-    try:
-        from app.models.category import Category
-        from app.models.carpet import Carpet
-        from app.services.product_extensions import ProductExtensionService
+    return _get_product_with_extended_info(db, Product.sku == sku)
 
-        query = (
+
+def _get_product_with_extended_info(db: Session, criterion) -> Optional[Product]:
+    """Загрузить товар одним запросом: фото, категория, тип товара и строка
+    расширения (для всех зарегистрированных типов) подтягиваются JOIN-ами"""
+    try:
+        product = (
             db.query(Product)
             .options(
                 joinedload(Product.photos),
                 joinedload(Product.category).joinedload(Category.product_type),
+                *ProductExtensionService.joined_load_options(),
             )
-            .filter(Product.sku == sku)
+            .filter(criterion)
+            .first()
         )
-
-        # Определяем тип товара для правильного join
-        product = query.first()
         if not product:
             return None
 
-        # Получаем sysname типа товара
-        product_type_sysname = (
-            product.category.product_type.sysname
-            if product.category and product.category.product_type
-            else None
-        )
-
-        # Если это ковер, делаем join с таблицей Carpet
-        if product_type_sysname == "carpet":
-            query = query.outerjoin(Carpet, Product.id == Carpet.product_id)
-            product = query.first()
-
-        # Добавляем extended_info
         product.extended_info = ProductExtensionService.get_extended_info(
-            product, product_type_sysname
+            product, product.category_product_type_sysname
         )
 
         return product
@@ -137,109 +163,222 @@ def get_product_by_sku_with_extended_info(db: Session, sku: str) -> Optional[Pro
 
 
 def get_products_by_product_type_sysname_with_extended_info(
-    db: Session, product_type_sysname: str, skip: int = 0, limit: int = 100
+    db: Session,
+    product_type_sysname: str,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    projection: Optional[ProductProjection] = None,
 ) -> List[Product]:
     """Получить товары по sysname типа товара с дополнительной информацией и фотографиями"""
     try:
-        from app.models.category import Category
-        from app.models.product_type import ProductType
-        from app.models.carpet import Carpet
-        from app.services.product_extensions import ProductExtensionService
-
         query = (
             db.query(Product)
-            .options(joinedload(Product.photos))
             .join(Category, Product.category_id == Category.id)
             .join(ProductType, Category.product_type_id == ProductType.id)
             .filter(ProductType.sysname == product_type_sysname)
         )
 
-        if product_type_sysname == "carpet":
-            query = query.outerjoin(Carpet, Product.id == Carpet.product_id)
-
-        products = query.offset(skip).limit(limit).all()
-
-        for product in products:
-            product.extended_info = ProductExtensionService.get_extended_info(
-                product, product_type_sysname
-            )
-
-        return products
+        return _paginate(query, skip, limit, cursor, sort, projection)
     except SQLAlchemyError as e:
         db.rollback()
         raise e
 
 
 def get_products_by_category_id_with_extended_info(
-    db: Session, category_id: int, skip: int = 0, limit: int = 100
+    db: Session,
+    category_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    projection: Optional[ProductProjection] = None,
 ) -> List[Product]:
     """Получить товары по ID категории (включая дочерние) с расширенной информацией и фото"""
     try:
-        from app.models.category import Category
-        from app.models.carpet import Carpet
-        from app.services.product_extensions import ProductExtensionService
-
-        # Собираем все ID дочерних категорий (включая родительскую)
-        category_ids: List[int] = []
-        queue: List[int] = [category_id]
-        while queue:
-            category_ids.extend(queue)
-            children = db.query(Category.id).filter(Category.parent_id.in_(queue)).all()
-            queue = [child_id for (child_id,) in children]
-
-        if not category_ids:
-            return []
-
+        # Поддерево категории берётся из таблицы замыкания по индексу
         query = (
             db.query(Product)
-            .options(
-                joinedload(Product.photos),
-                joinedload(Product.category).joinedload(Category.product_type),
-            )
-            .filter(Product.category_id.in_(category_ids))
-            .outerjoin(Carpet, Product.id == Carpet.product_id)
+            .join(CategoryClosure, CategoryClosure.descendant_id == Product.category_id)
+            .filter(CategoryClosure.ancestor_id == category_id)
         )
 
-        products = query.offset(skip).limit(limit).all()
-
-        for product in products:
-            product_type_sysname = (
-                product.category.product_type.sysname
-                if product.category and product.category.product_type
-                else None
-            )
-            product.extended_info = ProductExtensionService.get_extended_info(
-                product, product_type_sysname
-            )
-
-        return products
+        return _paginate(query, skip, limit, cursor, sort, projection)
     except SQLAlchemyError as e:
         db.rollback()
         raise e
 
 
+def _paginate(
+    query,
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    sort: str,
+    projection: Optional[ProductProjection] = None,
+) -> List[Product]:
+    """Выбрать страницу товаров в две фазы.
+
+    Сначала узким запросом выбираются только id страницы — по курсору (seek по
+    (ключ, id)) или по skip/limit. Затем товары по этим id грузятся вместе со
+    связями через selectinload, порядок страницы сохраняется, а extended_info
+    заполняется одним запросом на каждую таблицу расширения. С проекцией
+    грузятся только её колонки (и колонка сортировки для курсора) и связи.
+    """
+    id_query = apply_keyset(
+        query.with_entities(Product.id), sort, PRODUCT_SORT_COLUMNS, cursor
+    )
+    if cursor is None and skip:
+        id_query = id_query.offset(skip)
+    ids = [product_id for (product_id,) in id_query.limit(limit).all()]
+    if projection is None:
+        return _load_page(query.session, ids)
+    key, _ = parse_sort(sort, PRODUCT_SORT_COLUMNS)
+    return _load_page(
+        query.session,
+        ids,
+        with_extended_info=projection.with_extended_info,
+        options=projection.load_options([PRODUCT_SORT_COLUMNS[key]]),
+    )
+
+
+def _load_page(
+    db: Session,
+    ids: List[int],
+    with_extended_info: bool = True,
+    options: Sequence[Any] = LISTING_LOAD_OPTIONS,
+) -> List[Product]:
+    """Загрузить товары по списку id со связями, сохранив порядок списка"""
+    if not ids:
+        return []
+
+    products = db.query(Product).options(*options).filter(Product.id.in_(ids)).all()
+    by_id = {product.id: product for product in products}
+    page = [by_id[product_id] for product_id in ids if product_id in by_id]
+    if with_extended_info:
+        ProductExtensionService.attach_extended_info(db, page)
+    return page
+
+
 def search_products(
     db: Session, query: str, skip: int = 0, limit: int = 100
 ) -> List[Product]:
     """Поиск товаров по названию или описанию с фотографиями"""
     try:
         search_term = f"%{query}%"
-        return (
-            db.query(Product)
-            .options(joinedload(Product.photos))
+        ids = [
+            product_id
+            for (product_id,) in db.query(Product.id)
             .filter(
                 (Product.name.ilike(search_term))
                 | (Product.description.ilike(search_term))
             )
+            .order_by(Product.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        ]
+        return _load_page(db, ids, with_extended_info=False)
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+
+def search_products_ranked(
+    db: Session, query: str, skip: int = 0, limit: int = 100
+) -> List[Product]:
+    """Полнотекстовый поиск товаров (русская и английская морфология),
+    результаты упорядочены по релевантности ts_rank"""
+    try:
+        ts_query = product_search_query(query)
+        rank = func.ts_rank(Product.search_vector, ts_query)
+        ids = [
+            product_id
+            for (product_id,) in db.query(Product.id)
+            .filter(Product.search_vector.op("@@")(ts_query))
+            .order_by(rank.desc(), Product.id)
             .offset(skip)
             .limit(limit)
             .all()
+        ]
+        return _load_page(db, ids, with_extended_info=False)
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+
+def search_products_fuzzy(
+    db: Session, query: str, skip: int = 0, limit: int = 100
+) -> List[Product]:
+    """Нечёткий поиск товаров по триграммам (устойчив к опечаткам),
+    результаты упорядочены по похожести на запрос"""
+    try:
+        set_similarity_threshold(db)
+        # word_similarity: запрос сравнивается с наиболее похожим фрагментом
+        # названия или описания, а не со всей строкой целиком
+        term = literal(query)
+        similarity = func.greatest(
+            func.word_similarity(term, Product.name),
+            func.word_similarity(term, Product.description),
         )
+        ids = [
+            product_id
+            for (product_id,) in db.query(Product.id)
+            .filter(
+                or_(term.op("<%")(Product.name), term.op("<%")(Product.description))
+            )
+            .order_by(similarity.desc(), Product.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        ]
+        return _load_page(db, ids, with_extended_info=False)
     except SQLAlchemyError as e:
         db.rollback()
         raise e
 
 
+def suggest_products(db: Session, query: str, limit: int = 10) -> List:
+    """Подсказки по префиксу SKU или названия (без учёта регистра).
+
+    Возвращает строки (id, name, sku) без загрузки фото и связей: сначала
+    совпадения по SKU, затем по названию. Каждая ветка — диапазонное сканирование
+    префиксного индекса с LIMIT.
+    """
+    try:
+        prefix = _escape_like(query.strip().lower()) + "%"
+        branches = [
+            select(
+                Product.id,
+                Product.name,
+                Product.sku,
+                literal(priority).label("priority"),
+                key.label("key"),
+            )
+            .where(key.like(prefix, escape="\\"))
+            .order_by(key)
+            .limit(limit)
+            for priority, key in enumerate((SKU_PREFIX_KEY, NAME_PREFIX_KEY))
+        ]
+        rows = db.execute(union_all(*branches).order_by("priority", "key")).all()
+
+        suggestions, seen = [], set()
+        for row in rows:
+            if row.id not in seen:
+                seen.add(row.id)
+                suggestions.append(row)
+        return suggestions[:limit]
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+
+def _escape_like(value: str) -> str:
+    """Экранировать спецсимволы LIKE, чтобы ввод пользователя искался буквально"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
 def create_product(db: Session, product: ProductCreate) -> Product:
     """Создать новый товар"""
     try:
@@ -256,6 +395,9 @@ def create_product(db: Session, product: ProductCreate) -> Product:
         db_product = Product(**product.model_dump())
         db.add(db_product)
         db.commit()
+        if db_product.category_id is not None:
+            # Изменилось количество товаров в категории
+            category_tree_index.invalidate()
         db.refresh(db_product)
 
         return get_product(db, db_product.id)
@@ -294,10 +436,17 @@ def update_product(
         if "amount" in update_data and update_data["amount"] < 0:
             raise ValueError("Количество товара не может быть отрицательным")
 
+        category_changed = (
+            "category_id" in update_data
+            and update_data["category_id"] != db_product.category_id
+        )
+
         for field, value in update_data.items():
             setattr(db_product, field, value)
 
         db.commit()
+        if category_changed:
+            category_tree_index.invalidate()
         db.refresh(db_product)
 
         return get_product(db, product_id)
@@ -319,8 +468,11 @@ def delete_product(db: Session, product_id: int) -> bool:
     try:
         db_product = get_product(db, product_id)
         if db_product:
+            had_category = db_product.category_id is not None
             db.delete(db_product)
             db.commit()
+            if had_category:
+                category_tree_index.invalidate()
             return True
         return False
     except SQLAlchemyError as e:
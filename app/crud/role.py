@@ -1,9 +1,28 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from app.models.role import Role
-from app.models.user import UserRole
+from app.models.user import User, UserRole
 from app.schemas.role import RoleCreate, RoleUpdate
-from typing import Optional, List
+from app.core.auth import forget_users
+from typing import Iterable, Optional, List
+
+
+def _bump_roles_version(db: Session, user_ids: Iterable[int]) -> List[int]:
+    """Увеличить версию ролей пользователей (без commit): их токены устаревают"""
+    user_ids = list(user_ids)
+    if user_ids:
+        db.query(User).filter(User.id.in_(user_ids)).update(
+            {User.roles_version: User.roles_version + 1}, synchronize_session="fetch"
+        )
+    return user_ids
+
+
+def _role_user_ids(db: Session, role_id: int) -> List[int]:
+    """id пользователей с ролью"""
+    return [
+        user_id
+        for (user_id,) in db.query(UserRole.user_id).filter(UserRole.role_id == role_id)
+    ]
 
 
 def get_role(db: Session, role_id: int) -> Optional[Role]:
@@ -57,10 +76,16 @@ def update_role(db: Session, role_id: int, role: RoleUpdate) -> Optional[Role]:
             return None
 
         update_data = role.model_dump(exclude_unset=True)
+        # В токенах роли хранятся по названию
+        renamed = "name" in update_data and update_data["name"] != db_role.name
         for field, value in update_data.items():
             setattr(db_role, field, value)
+        user_ids = (
+            _bump_roles_version(db, _role_user_ids(db, role_id)) if renamed else []
+        )
 
         db.commit()
+        forget_users(user_ids)
         db.refresh(db_role)
         return db_role
     except IntegrityError:
@@ -76,8 +101,10 @@ def delete_role(db: Session, role_id: int) -> bool:
     try:
         db_role = get_role(db, role_id)
         if db_role:
+            user_ids = _bump_roles_version(db, _role_user_ids(db, role_id))
             db.delete(db_role)
             db.commit()
+            forget_users(user_ids)
             return True
         return False
     except SQLAlchemyError as e:
@@ -110,7 +137,9 @@ def add_role_to_user(db: Session, user_id: int, role_id: int) -> bool:
 
         user_role = UserRole(user_id=user_id, role_id=role_id)
         db.add(user_role)
+        _bump_roles_version(db, [user_id])
         db.commit()
+        forget_users([user_id])
         return True
     except IntegrityError:
         db.rollback()
@@ -131,7 +160,9 @@ def remove_role_from_user(db: Session, user_id: int, role_id: int) -> bool:
 
         if user_role:
             db.delete(user_role)
+            _bump_roles_version(db, [user_id])
             db.commit()
+            forget_users([user_id])
             return True
         return False
     except SQLAlchemyError as e:
@@ -149,8 +180,10 @@ def set_user_roles(db: Session, user_id: int, role_ids: List[int]) -> bool:
         for role_id in role_ids:
             user_role = UserRole(user_id=user_id, role_id=role_id)
             db.add(user_role)
+        _bump_roles_version(db, [user_id])
 
         db.commit()
+        forget_users([user_id])
         return True
     except SQLAlchemyError as e:
         db.rollback()
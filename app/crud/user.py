@@ -0,0 +1,79 @@
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.models.user import User, UserProfile, UserRole
+from app.crud import role as crud_role
+from typing import Optional
+
+# Роли нужны сразу для токена: в асинхронном обработчике ленивая загрузка недоступна
+USER_ROLES_OPTIONS = (selectinload(User.user_roles).joinedload(UserRole.role),)
+
+
+def get_user(db: Session, user_id: int) -> Optional[User]:
+    """Получить пользователя по ID вместе с ролями"""
+    try:
+        return (
+            db.query(User)
+            .options(*USER_ROLES_OPTIONS)
+            .filter(User.id == user_id)
+            .first()
+        )
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+
+def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    """Получить пользователя по email вместе с ролями"""
+    try:
+        return (
+            db.query(User)
+            .options(*USER_ROLES_OPTIONS)
+            .filter(User.email == email)
+            .first()
+        )
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+
+def create_user(
+    db: Session,
+    email: str,
+    password_hash: str,
+    role_id: int,
+    first_name: Optional[str] = None,
+    last_name: Optional[str] = None,
+) -> User:
+    """Создать пользователя с профилем (если задано имя) и ролью"""
+    try:
+        user = User(email=email, password_hash=password_hash)
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+
+        if first_name or last_name:
+            db.add(
+                UserProfile(user_id=user.id, first_name=first_name, last_name=last_name)
+            )
+        crud_role.add_role_to_user(db, user.id, role_id)
+        db.commit()
+
+        return get_user(db, user.id)
+    except IntegrityError:
+        db.rollback()
+        raise
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
+
+
+def update_password_hash(db: Session, user_id: int, password_hash: str) -> None:
+    """Заменить хеш пароля (пересчёт устаревшего хеша при входе)"""
+    try:
+        db.query(User).filter(User.id == user_id).update(
+            {User.password_hash: password_hash}, synchronize_session=False
+        )
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
@@ -1,9 +1,111 @@
+from uuid import uuid4
+
+from fastapi import Request, Response
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
-from app.config import DATABASE_URL
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.config import (
+    ASYNC_DATABASE_REPLICA_URL,
+    ASYNC_DATABASE_URL,
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_PGBOUNCER,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    READ_AFTER_WRITE_SECONDS,
+    REPLICA_LAG_CHECK_SECONDS,
+    REPLICA_MAX_LAG_SECONDS,
+)
+from app.core.metrics import register_collector
+from app.core.pool import PoolMetrics, timed_pool_class
+from app.core.replica import ReplicaRouter
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+POOL_OPTIONS = dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
 
-engine = create_engine(DATABASE_URL, future=True)
+engine = create_engine(
+    DATABASE_URL,
+    future=True,
+    poolclass=timed_pool_class(QueuePool, PoolMetrics()),
+    **POOL_OPTIONS,
+)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+# PgBouncer в режиме transaction переключает серверные соединения между
+# транзакциями: подготовленные asyncpg выражения не переживают переключения,
+# поэтому кэши отключаются, а имена выражений делаются уникальными
+ASYNC_CONNECT_ARGS = (
+    {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+    if DB_PGBOUNCER
+    else {}
+)
+
+# Асинхронный движок (asyncpg) для обработчиков запросов. Объекты не истекают
+# после commit: ответ сериализуется после выхода из сессии, без ленивых загрузок
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=timed_pool_class(AsyncAdaptedQueuePool, PoolMetrics()),
+    connect_args=ASYNC_CONNECT_ARGS,
+    **POOL_OPTIONS,
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+# Реплика для чтения (необязательна): те же настройки пула и драйвера
+async_replica_engine = None
+AsyncReplicaSessionLocal = None
+replica_router = None
+if ASYNC_DATABASE_REPLICA_URL:
+    async_replica_engine = create_async_engine(
+        ASYNC_DATABASE_REPLICA_URL,
+        poolclass=timed_pool_class(AsyncAdaptedQueuePool, PoolMetrics()),
+        connect_args=ASYNC_CONNECT_ARGS,
+        **POOL_OPTIONS,
+    )
+    AsyncReplicaSessionLocal = async_sessionmaker(
+        bind=async_replica_engine, autoflush=False, expire_on_commit=False
+    )
+    replica_router = ReplicaRouter(
+        async_replica_engine,
+        max_lag=REPLICA_MAX_LAG_SECONDS,
+        check_interval=REPLICA_LAG_CHECK_SECONDS,
+        read_after_write=READ_AFTER_WRITE_SECONDS,
+    )
+
+
+def _pool_snapshot(pool):
+    return pool.metrics.snapshot(pool)
+
+
+def _pool_metrics():
+    pools = {
+        "sync": _pool_snapshot(engine.pool),
+        "async": _pool_snapshot(async_engine.sync_engine.pool),
+    }
+    if async_replica_engine is not None:
+        pools["replica"] = _pool_snapshot(async_replica_engine.sync_engine.pool)
+    return pools
+
+
+register_collector("db_pool", _pool_metrics)
+if replica_router is not None:
+    register_collector("db_replica", replica_router.snapshot)
+
 Base = declarative_base()
 
 # Импортируем все модели для корректной работы Alembic
@@ -24,3 +126,42 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db(request: Request, response: Response):
+    """Асинхронная сессия основного сервера на запрос.
+
+    Синхронные функции из app/crud выполняются через `await db.run_sync(fn, ...)`:
+    SQLAlchemy запускает их в greenlet поверх asyncpg, не занимая поток.
+    Изменяющие запросы открывают окно чтения после записи (см. ReplicaRouter).
+    """
+    if request.method not in SAFE_METHODS:
+        mark_write(response)
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_primary_db():
+    """Асинхронная сессия основного сервера без отметки записи.
+
+    Для изменяющих запросов, которые обычно только читают (вход): окно чтения
+    после записи открывает сам обработчик через mark_write, если записал.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def mark_write(response: Response) -> None:
+    """Открыть окно чтения после записи для клиента и процесса"""
+    if replica_router is not None:
+        replica_router.mark_write(response)
+
+
+async def get_async_read_db(request: Request):
+    """Асинхронная сессия только для чтения: реплика, если она настроена,
+    не отстаёт и клиент недавно не писал, иначе основной сервер"""
+    session_factory = AsyncSessionLocal
+    if replica_router is not None and await replica_router.use_replica(request):
+        session_factory = AsyncReplicaSessionLocal
+    async with session_factory() as db:
+        yield db
@@ -4,6 +4,7 @@ from app.routers import auth, category, product, carpet, role, product_type
 from starlette.staticfiles import StaticFiles
 import os
 from app.config import MEDIA_ROOT
+from app.core.metrics import collect
 from app.core.exceptions import (
     ValidationError,
     NotFoundError,
@@ -41,12 +42,19 @@ def health():
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+async def metrics():
+    """Метрики процесса: состояние пулов соединений и ожидание соединения"""
+    return collect()
+
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(_request, exc):
     """Глобальный обработчик HTTP исключений"""
     return JSONResponse(
         status_code=exc.status_code,
         content={"error": exc.detail, "status_code": exc.status_code},
+        headers=exc.headers,
     )
 
 
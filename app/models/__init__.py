@@ -1,5 +1,5 @@
 from .user import User, UserProfile, UserProvider, UserRole
-from .category import Category
+from .category import Category, CategoryClosure
 from .product import Product
 from .product_photo import ProductPhoto
 from .carpet import Carpet
@@ -1,5 +1,14 @@
-from sqlalchemy import Column, String, ForeignKey, BigInteger, Numeric
+from sqlalchemy import (
+    Column,
+    String,
+    ForeignKey,
+    BigInteger,
+    Numeric,
+    Index,
+    DateTime,
+)
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from app.database import Base
 
 
@@ -19,6 +28,31 @@ class Carpet(Base):
     material = Column(String, nullable=True)
     origin = Column(String, nullable=True)
     age = Column(String, nullable=True)
+    # Версия для ETag / Last-Modified
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
+    __table_args__ = (
+        # Поиск по диапазону размеров
+        Index("ix_carpets_width_length", "width", "length"),
+        # Триграммы: ILIKE '%q%' и нечёткий поиск по материалу и происхождению
+        Index(
+            "ix_carpets_material_trgm",
+            "material",
+            postgresql_using="gin",
+            postgresql_ops={"material": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_carpets_origin_trgm",
+            "origin",
+            postgresql_using="gin",
+            postgresql_ops={"origin": "gin_trgm_ops"},
+        ),
+    )
 
     # Связи
     product = relationship("Product", back_populates="carpet")
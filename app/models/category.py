@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, ForeignKey, BigInteger, DateTime
+from sqlalchemy import Column, String, ForeignKey, BigInteger, DateTime, Integer, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -10,7 +10,10 @@ class Category(Base):
     id = Column(BigInteger, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
     parent_id = Column(
-        BigInteger, ForeignKey("categories.id", ondelete="CASCADE"), nullable=True
+        BigInteger,
+        ForeignKey("categories.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
     )
     product_type_id = Column(
         BigInteger, ForeignKey("product_types.id", ondelete="SET NULL"), nullable=True
@@ -32,3 +35,23 @@ class Category(Base):
     )
     products = relationship("Product", back_populates="category")
     product_type = relationship("ProductType", back_populates="categories")
+
+
+class CategoryClosure(Base):
+    """Таблица замыкания иерархии: пара (предок, потомок) для всех уровней,
+    включая саму категорию с depth = 0"""
+
+    __tablename__ = "category_closure"
+
+    ancestor_id = Column(
+        BigInteger, ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True
+    )
+    descendant_id = Column(
+        BigInteger, ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True
+    )
+    depth = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        # Поиск предков (хлебные крошки, проверка циклов)
+        Index("ix_category_closure_descendant_id", "descendant_id", "depth"),
+    )
@@ -1,5 +1,6 @@
 from sqlalchemy import (
     Column,
+    Computed,
     Integer,
     String,
     Text,
@@ -7,11 +8,27 @@ from sqlalchemy import (
     BigInteger,
     Numeric,
     DateTime,
+    Index,
+    cast,
+    literal,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import REGCONFIG, TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 from app.database import Base
 
+# Конфигурации полнотекстового поиска: каталог на русском, часть названий на английском
+SEARCH_CONFIGS = ("russian", "english")
+
+# Поисковый вектор: SKU и название важнее описания (веса A и B)
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('simple', coalesce(sku, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
 
 class Product(Base):
     __tablename__ = "products"
@@ -19,7 +36,7 @@ class Product(Base):
     id = Column(BigInteger, primary_key=True, index=True)
     sku = Column(String, nullable=False, unique=True, index=True)
     price = Column(Numeric(10, 2), nullable=False)
-    name = Column(String, nullable=False, index=True)
+    name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     category_id = Column(
         BigInteger, ForeignKey("categories.id", ondelete="SET NULL"), nullable=True
@@ -27,6 +44,35 @@ class Product(Base):
     amount = Column(Integer, default=0)  # Количество на складе
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Генерируемая колонка; не загружается вместе с товаром
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(SEARCH_VECTOR_EXPRESSION, persisted=True),
+            nullable=True,
+        )
+    )
+
+    __table_args__ = (
+        # Списки категории и сортировки с курсорной пагинацией: (ключ, id)
+        Index("ix_products_category_id_id", "category_id", "id"),
+        Index("ix_products_price_id", "price", "id"),
+        Index("ix_products_name_id", "name", "id"),
+        Index("ix_products_search_vector", "search_vector", postgresql_using="gin"),
+        # Триграммы: ILIKE '%q%' и нечёткий поиск без последовательного сканирования
+        Index(
+            "ix_products_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_products_description_trgm",
+            "description",
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        ),
+    )
 
     # Связи
     category = relationship("Category", back_populates="products")
@@ -47,3 +93,28 @@ class Product(Base):
             if self.category and self.category.product_type
             else None
         )
+
+    @property
+    def main_photo(self):
+        return next((photo for photo in self.photos if photo.is_main), None)
+
+
+def product_search_query(text: str):
+    """tsquery из пользовательской строки: совпадение в любой из конфигураций"""
+    queries = [
+        func.websearch_to_tsquery(cast(literal(config), REGCONFIG), text)
+        for config in SEARCH_CONFIGS
+    ]
+    result = queries[0]
+    for query in queries[1:]:
+        result = result.op("||")(query)
+    return result
+
+
+# Ключи префиксного поиска (подсказки): без учёта регистра, в побайтовом порядке
+# (COLLATE "C"), чтобы btree обслуживал и LIKE 'q%', и ORDER BY ... LIMIT
+NAME_PREFIX_KEY = func.lower(Product.name).collate("C")
+SKU_PREFIX_KEY = func.lower(Product.sku).collate("C")
+
+Index("ix_products_name_prefix", NAME_PREFIX_KEY)
+Index("ix_products_sku_prefix", SKU_PREFIX_KEY)
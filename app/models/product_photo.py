@@ -1,4 +1,14 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, BigInteger, Boolean
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Text,
+    ForeignKey,
+    BigInteger,
+    Boolean,
+    Index,
+    text,
+)
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -11,7 +21,6 @@ class ProductPhoto(Base):
         BigInteger,
         ForeignKey("products.id", ondelete="CASCADE"),
         nullable=False,
-        index=True,
     )
 
     filename = Column(String, nullable=False)
@@ -20,5 +29,17 @@ class ProductPhoto(Base):
     is_main = Column(Boolean, default=False)
     sort_order = Column(Integer, default=0)
 
+    __table_args__ = (
+        # Фото товара в порядке сортировки; покрывает и поиск по product_id
+        Index("ix_product_photos_product_id_sort_order", "product_id", "sort_order"),
+        # Не больше одного главного фото на товар
+        Index(
+            "uq_product_photos_main",
+            "product_id",
+            unique=True,
+            postgresql_where=text("is_main"),
+        ),
+    )
+
     # Связь с товаром
     product = relationship("Product", back_populates="photos")
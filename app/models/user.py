@@ -5,6 +5,7 @@ from sqlalchemy import (
     Text,
     BigInteger,
     ForeignKey,
+    Integer,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -19,6 +20,8 @@ class User(Base):
     password_hash = Column(Text, nullable=True)  # может быть NULL для соцсетей
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Растёт при каждом изменении ролей; токен с другой версией недействителен
+    roles_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Связи
     profile = relationship("UserProfile", back_populates="user", uselist=False)
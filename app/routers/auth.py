@@ -1,76 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.database import get_async_primary_db, mark_write
 from app.core.auth import (
-    hash_password,
-    verify_password,
+    Principal,
     create_access_token,
     get_current_user_dep,
 )
-from app.models.user import User, UserProfile
+from app.core.exceptions import ServiceUnavailableError
+from app.core.hashing import password_hasher
 from app.schemas.auth import RegisterRequest, LoginRequest, TokenResponse, UserResponse
 from app.crud import role as crud_role
+from app.crud import user as crud_user
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 
 @router.post("/register", response_model=TokenResponse)
-def register(data: RegisterRequest, db: Session = Depends(get_db)):
+async def register(
+    data: RegisterRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_async_primary_db),
+):
     """Регистрация нового пользователя (создается с ролью customer по умолчанию)"""
     # Проверка существования пользователя
-    if db.query(User).filter(User.email == data.email).first():
+    if await db.run_sync(crud_user.get_user_by_email, data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Пользователь с таким email уже существует",
         )
 
     # Получаем роль customer по умолчанию
-    customer_role = crud_role.get_role_by_name(db, "customer")
+    customer_role = await db.run_sync(crud_role.get_role_by_name, "customer")
     if not customer_role:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Роль по умолчанию 'customer' не найдена",
         )
 
+    # bcrypt — в пуле процессов; при его перегрузке сразу 503. Соединение
+    # с базой на время ожидания пула возвращаем, чтобы его не ждало чтение каталога
+    await db.close()
+    password_hash = await password_hasher.hash(data.password)
+
     try:
-        # Создаем пользователя
-        new_user = User(
-            email=data.email,
-            password_hash=hash_password(data.password),
+        # Создаем пользователя с профилем и ролью по умолчанию
+        new_user = await db.run_sync(
+            crud_user.create_user,
+            data.email,
+            password_hash,
+            customer_role.id,
+            first_name=data.first_name,
+            last_name=data.last_name,
         )
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
-
-        # Создаем профиль пользователя
-        if data.first_name or data.last_name:
-            user_profile = UserProfile(
-                user_id=new_user.id,
-                first_name=data.first_name,
-                last_name=data.last_name,
-            )
-            db.add(user_profile)
-
-        # Добавляем роль по умолчанию
-        crud_role.add_role_to_user(db, new_user.id, customer_role.id)
-
-        db.commit()
-        db.refresh(new_user)
+        mark_write(response)
 
-        # Создаем токен с user_id и массивом ролей
+        # Создаем токен с user_id, массивом ролей и их версией
         token = create_access_token(
-            {"user_id": new_user.id, "roles": new_user.role_names}
+            {
+                "user_id": new_user.id,
+                "roles": new_user.role_names,
+                "rv": new_user.roles_version,
+            }
         )
         return {"access_token": token}
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Регистрация не удалась: нарушение целостности данных",
         )
     except Exception:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Внутренняя ошибка сервера при регистрации",
@@ -78,29 +79,56 @@ def register(data: RegisterRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(data: LoginRequest, db: Session = Depends(get_db)):
-    """Аутентификация пользователя"""
+async def login(
+    data: LoginRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_async_primary_db),
+):
+    """Аутентификация пользователя.
+
+    Вход только читает пользователя, поэтому не открывает окно чтения после
+    записи: иначе шквал входов отправил бы всё чтение каталога процесса
+    на основной сервер. Окно открывается, только если сохранён пересчитанный хеш.
+    """
     try:
-        user = db.query(User).filter(User.email == data.email).first()
+        user = await db.run_sync(crud_user.get_user_by_email, data.email)
         # Нет пользователя или пароль не установлен (например, соц. вход)
         if not user or not user.password_hash:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Неверный email или пароль",
             )
+        # Соединение с базой на время ожидания пула хеширования возвращаем,
+        # чтобы его не ждало чтение каталога
+        await db.close()
         try:
-            is_valid = verify_password(data.password, user.password_hash)
+            # Хеширование — в пуле процессов; при его перегрузке сразу 503
+            is_valid, new_hash = await password_hasher.verify_and_update(
+                data.password, user.password_hash
+            )
+        except ServiceUnavailableError:
+            raise
         except Exception:
             # Любые ошибки верификации отображаем как неуспешные креды, без раскрытия деталей
-            is_valid = False
+            is_valid, new_hash = False, None
         if not is_valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Неверный email или пароль",
             )
+        if new_hash:
+            # Хеш другой схемы или стоимости: пароль известен только сейчас.
+            # Не удалось сохранить — пересчитаем при следующем входе
+            try:
+                await db.run_sync(crud_user.update_password_hash, user.id, new_hash)
+                mark_write(response)
+            except SQLAlchemyError:
+                pass
 
-        # Создаем токен с user_id и массивом ролей
-        token = create_access_token({"user_id": user.id, "roles": user.role_names})
+        # Создаем токен с user_id, массивом ролей и их версией
+        token = create_access_token(
+            {"user_id": user.id, "roles": user.role_names, "rv": user.roles_version}
+        )
         return {"access_token": token}
     except HTTPException:
         raise
@@ -112,7 +140,9 @@ def login(data: LoginRequest, db: Session = Depends(get_db)):
 
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user_dep)):
+def get_current_user_info(
+    current_user: Principal = Depends(get_current_user_dep),
+):
     """Получить информацию о текущем пользователе"""
     try:
         return current_user
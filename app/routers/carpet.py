@@ -1,128 +1,233 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from app.database import get_db
+from app.database import get_async_db, get_async_read_db
 from app.core.auth import require_admin_role
+from app.core.cache import response_cache
+from app.core.conditional import check_conditional, collection_etag, make_etag
 from app.crud import carpet as crud_carpet
-from app.schemas.carpet import CarpetCreate, CarpetUpdate, CarpetOut, CarpetWithProduct
+from app.schemas.carpet import (
+    CarpetCreate,
+    CarpetUpdate,
+    CarpetOut,
+    CarpetWithProduct,
+    CarpetFacetedSearch,
+)
 
 router = APIRouter(prefix="/carpets", tags=["Carpets"])
 
+FUZZY_DESCRIPTION = (
+    "Нечёткий поиск по триграммам, устойчивый к опечаткам, "
+    "с сортировкой по похожести"
+)
+
 
 @router.get("", response_model=List[CarpetOut])
-def get_carpets(
+async def get_carpets(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """Получить список всех ковров"""
-    carpets = crud_carpet.get_carpets(db, skip=skip, limit=limit)
+    carpets = await db.run_sync(crud_carpet.get_carpets, skip=skip, limit=limit)
+    etag = collection_etag((carpet.id, carpet.updated_at) for carpet in carpets)
+    unchanged = check_conditional(request, response, etag)
+    if unchanged is not None:
+        return unchanged
     return carpets
 
 
 @router.get("/search/material", response_model=List[CarpetOut])
-def search_carpets_by_material(
+async def search_carpets_by_material(
     material: str = Query(..., min_length=1),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    fuzzy: bool = Query(False, description=FUZZY_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """Поиск ковров по материалу"""
-    carpets = crud_carpet.search_carpets_by_material(
-        db, material, skip=skip, limit=limit
+    carpets = await db.run_sync(
+        crud_carpet.search_carpets_by_material,
+        material,
+        skip=skip,
+        limit=limit,
+        fuzzy=fuzzy,
     )
     return carpets
 
 
 @router.get("/search/origin", response_model=List[CarpetOut])
-def search_carpets_by_origin(
+async def search_carpets_by_origin(
     origin: str = Query(..., min_length=1),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    fuzzy: bool = Query(False, description=FUZZY_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """Поиск ковров по происхождению"""
-    carpets = crud_carpet.search_carpets_by_origin(db, origin, skip=skip, limit=limit)
+    carpets = await db.run_sync(
+        crud_carpet.search_carpets_by_origin,
+        origin,
+        skip=skip,
+        limit=limit,
+        fuzzy=fuzzy,
+    )
     return carpets
 
 
 @router.get("/search/size", response_model=List[CarpetOut])
-def search_carpets_by_size(
+async def search_carpets_by_size(
     min_width: Optional[float] = Query(None, ge=0),
     max_width: Optional[float] = Query(None, ge=0),
     min_length: Optional[float] = Query(None, ge=0),
     max_length: Optional[float] = Query(None, ge=0),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """Поиск ковров по размеру"""
-    carpets = crud_carpet.get_carpets_by_size_range(
-        db, min_width, max_width, min_length, max_length, skip, limit
+    carpets = await db.run_sync(
+        crud_carpet.get_carpets_by_size_range,
+        min_width,
+        max_width,
+        min_length,
+        max_length,
+        skip,
+        limit,
     )
     return carpets
 
 
+@router.get("/facets", response_model=CarpetFacetedSearch)
+async def search_carpets_faceted(
+    material: Optional[List[str]] = Query(None, description="Материалы (ИЛИ)"),
+    origin: Optional[List[str]] = Query(None, description="Происхождение (ИЛИ)"),
+    min_width: Optional[float] = Query(None, ge=0),
+    max_width: Optional[float] = Query(None, ge=0),
+    min_length: Optional[float] = Query(None, ge=0),
+    max_length: Optional[float] = Query(None, ge=0),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Поиск ковров по комбинации фильтров с количеством по фасетам"""
+    try:
+        return await db.run_sync(
+            crud_carpet.search_carpets_faceted,
+            materials=material,
+            origins=origin,
+            min_width=min_width,
+            max_width=max_width,
+            min_length=min_length,
+            max_length=max_length,
+            min_price=min_price,
+            max_price=max_price,
+            skip=skip,
+            limit=limit,
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка при поиске ковров: {str(e)}",
+        )
+
+
 @router.get("/{carpet_id}", response_model=CarpetOut)
-def get_carpet(carpet_id: int, db: Session = Depends(get_db)):
+async def get_carpet(
+    carpet_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+):
     """Получить ковер по ID"""
-    carpet = crud_carpet.get_carpet(db, carpet_id)
+    carpet = await db.run_sync(crud_carpet.get_carpet, carpet_id)
     if not carpet:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Carpet not found"
         )
-    return carpet
+    return _conditional_carpet(request, response, carpet)
 
 
 @router.get("/product/{product_id}", response_model=CarpetOut)
-def get_carpet_by_product_id(product_id: int, db: Session = Depends(get_db)):
+async def get_carpet_by_product_id(
+    product_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+):
     """Получить ковер по ID товара"""
-    carpet = crud_carpet.get_carpet_by_product_id(db, product_id)
+    carpet = await db.run_sync(crud_carpet.get_carpet_by_product_id, product_id)
     if not carpet:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Carpet not found"
         )
-    return carpet
+    return _conditional_carpet(request, response, carpet)
+
+
+def _conditional_carpet(request: Request, response: Response, carpet):
+    """Ковёр или 304, если у клиента актуальная версия"""
+    unchanged = check_conditional(
+        request,
+        response,
+        make_etag("carpet", carpet.id, carpet.updated_at),
+        carpet.updated_at,
+    )
+    return carpet if unchanged is None else unchanged
 
 
 @router.post("", response_model=CarpetOut, dependencies=[Depends(require_admin_role)])
-def create_carpet(
+async def create_carpet(
     carpet: CarpetCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Создать новый ковер (только для админов)"""
     try:
-        return crud_carpet.create_carpet(db, carpet)
+        created = await db.run_sync(crud_carpet.create_carpet, carpet)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    # Ковёр — расширение карточки товара (extended_info)
+    await response_cache.invalidate(f"product:{created.product_id}")
+    return created
 
 
 @router.put(
     "/{carpet_id}", response_model=CarpetOut, dependencies=[Depends(require_admin_role)]
 )
-def update_carpet(
+async def update_carpet(
     carpet_id: int,
     carpet: CarpetUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Обновить ковер (только для админов)"""
-    updated_carpet = crud_carpet.update_carpet(db, carpet_id, carpet)
+    updated_carpet = await db.run_sync(crud_carpet.update_carpet, carpet_id, carpet)
     if not updated_carpet:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Carpet not found"
         )
+    await response_cache.invalidate(f"product:{updated_carpet.product_id}")
     return updated_carpet
 
 
 @router.delete("/{carpet_id}", dependencies=[Depends(require_admin_role)])
-def delete_carpet(
+async def delete_carpet(
     carpet_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Удалить ковер (только для админов)"""
-    success = crud_carpet.delete_carpet(db, carpet_id)
+    existing = await db.run_sync(crud_carpet.get_carpet, carpet_id)
+    if not existing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Carpet not found"
+        )
+    product_id = existing.product_id
+    success = await db.run_sync(crud_carpet.delete_carpet, carpet_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Carpet not found"
         )
+    await response_cache.invalidate(f"product:{product_id}")
     return {"message": "Carpet deleted successfully"}
@@ -1,44 +1,87 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.database import get_db
+from app.database import get_async_db, get_async_read_db
 from app.core.auth import require_admin_role
+from app.core.cache import response_cache
+from app.core.conditional import (
+    check_conditional,
+    collection_etag,
+    make_etag,
+    not_modified,
+    validator_headers,
+)
 from app.crud import category as crud_category
-from app.schemas.category import CategoryCreate, CategoryUpdate, CategoryWithComputed
-from app.models.category import Category
+from app.schemas.category import (
+    CategoryCreate,
+    CategoryUpdate,
+    CategoryOut,
+    CategoryWithComputed,
+)
+from app.services.category_tree import category_tree_index
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
 
+def _tree_etag(tree) -> str:
+    """ETag ответов, собранных из снимка дерева. Last-Modified не отдаётся:
+    счётчики товаров меняются без изменения updated_at категорий"""
+    return make_etag("categories", tree.version)
+
+
 @router.get("", response_model=List[CategoryWithComputed])
-def get_categories(
+async def get_categories(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
-    all_categories = db.query(Category).all()
-    categories = all_categories[skip : skip + limit]
-
-    return crud_category.enrich_categories_with_computed_fields(
-        db, categories, include_children=False
-    )
+    tree = await db.run_sync(category_tree_index.get)
+    unchanged = check_conditional(request, response, _tree_etag(tree))
+    if unchanged is not None:
+        return unchanged
+    return tree.all()[skip : skip + limit]
 
 
 @router.get("/tree", response_model=List[CategoryWithComputed])
-def get_category_tree(db: Session = Depends(get_db)):
-
-    roots = db.query(Category).filter(Category.parent_id.is_(None)).all()
-    return crud_category.enrich_categories_with_computed_fields(db, roots)
+async def get_category_tree(
+    request: Request, db: AsyncSession = Depends(get_async_read_db)
+):
+    tree = await db.run_sync(category_tree_index.get)
+    etag = _tree_etag(tree)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    headers = validator_headers(etag)
+    cached = await response_cache.get(request, etag, headers)
+    if cached is not None:
+        return cached
+    return await response_cache.store(
+        request,
+        List[CategoryWithComputed],
+        tree.tree(),
+        ["categories"],
+        etag,
+        headers,
+    )
 
 
 @router.get("/root", response_model=List[CategoryWithComputed])
-def get_root_categories(db: Session = Depends(get_db)):
+async def get_root_categories(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+):
     """Получить корневые категории"""
     try:
-        categories = crud_category.get_root_categories(db)
-        return crud_category.enrich_categories_with_computed_fields(
-            db, categories, include_children=False
-        )
+        tree = await db.run_sync(category_tree_index.get)
+        unchanged = check_conditional(request, response, _tree_etag(tree))
+        if unchanged is not None:
+            return unchanged
+        return [
+            tree.to_schema(root_id, include_children=False) for root_id in tree.roots
+        ]
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -47,15 +90,23 @@ def get_root_categories(db: Session = Depends(get_db)):
 
 
 @router.get("/{category_id}", response_model=CategoryWithComputed)
-def get_category(category_id: int, db: Session = Depends(get_db)):
+async def get_category(
+    category_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+):
     """Получить категорию по ID"""
     try:
-        category = crud_category.get_category(db, category_id)
-        if not category:
+        tree = await db.run_sync(category_tree_index.get_containing, category_id)
+        if category_id not in tree:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Категория не найдена"
             )
-        return crud_category.enrich_category_with_computed_fields(db, category)
+        unchanged = check_conditional(request, response, _tree_etag(tree))
+        if unchanged is not None:
+            return unchanged
+        return tree.to_schema(category_id)
     except HTTPException:
         raise
     except Exception:
@@ -66,24 +117,52 @@ def get_category(category_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/{category_id}/children", response_model=List[CategoryWithComputed])
-def get_category_children(category_id: int, db: Session = Depends(get_db)):
-    parent = crud_category.get_category(db, category_id)
-    if not parent:
+async def get_category_children(
+    category_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    tree = await db.run_sync(category_tree_index.get_containing, category_id)
+    if category_id not in tree:
         raise HTTPException(status_code=404, detail="Родительская категория не найдена")
-    children = crud_category.get_category_children(db, category_id)
-    return crud_category.enrich_categories_with_computed_fields(db, children)
+    unchanged = check_conditional(request, response, _tree_etag(tree))
+    if unchanged is not None:
+        return unchanged
+    return [tree.to_schema(child_id) for child_id in tree.children[category_id]]
+
+
+@router.get("/{category_id}/breadcrumbs", response_model=List[CategoryOut])
+async def get_category_breadcrumbs(
+    category_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Получить цепочку категорий от корня до указанной"""
+    breadcrumbs = await db.run_sync(crud_category.get_category_breadcrumbs, category_id)
+    if not breadcrumbs:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Категория не найдена"
+        )
+    etag = collection_etag((c.id, c.updated_at) for c in breadcrumbs)
+    unchanged = check_conditional(request, response, etag)
+    if unchanged is not None:
+        return unchanged
+    return breadcrumbs
 
 
 @router.post(
     "", response_model=CategoryWithComputed, dependencies=[Depends(require_admin_role)]
 )
-def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
+async def create_category(
+    category: CategoryCreate, db: AsyncSession = Depends(get_async_db)
+):
     """Создать новую категорию (только для админов)"""
     try:
-        created_category = crud_category.create_category(db, category)
-        all_categories = db.query(Category).all()
-        return crud_category.enrich_category_with_computed_fields(
-            db, created_category, all_categories
+        created_category = await db.run_sync(crud_category.create_category, category)
+        enriched = await db.run_sync(
+            crud_category.enrich_category_with_computed_fields, created_category
         )
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -92,6 +171,8 @@ def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Внутренняя ошибка сервера при создании категории",
         )
+    await response_cache.invalidate("categories")
+    return enriched
 
 
 @router.put(
@@ -99,28 +180,28 @@ def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
     response_model=CategoryWithComputed,
     dependencies=[Depends(require_admin_role)],
 )
-def update_category(
-    category_id: int, category: CategoryUpdate, db: Session = Depends(get_db)
+async def update_category(
+    category_id: int, category: CategoryUpdate, db: AsyncSession = Depends(get_async_db)
 ):
     """Обновить категорию (только для админов)"""
     try:
         # Сначала проверяем существование
-        existing_category = crud_category.get_category(db, category_id)
+        existing_category = await db.run_sync(crud_category.get_category, category_id)
         if not existing_category:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Категория не найдена"
             )
 
-        updated_category = crud_category.update_category(db, category_id, category)
+        updated_category = await db.run_sync(
+            crud_category.update_category, category_id, category
+        )
         if not updated_category:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Категория не найдена"
             )
 
-        # Предзагружаем для оптимизации
-        all_categories = db.query(Category).all()
-        return crud_category.enrich_category_with_computed_fields(
-            db, updated_category, all_categories
+        enriched = await db.run_sync(
+            crud_category.enrich_category_with_computed_fields, updated_category
         )
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -131,21 +212,28 @@ def update_category(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Внутренняя ошибка сервера при обновлении категории",
         )
+    # Карточки товаров категории показывают её название и тип товара
+    await response_cache.invalidate("categories", f"category:{category_id}")
+    return enriched
 
 
 @router.delete("/{category_id}", dependencies=[Depends(require_admin_role)])
-def delete_category(
+async def delete_category(
     category_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Удалить категорию (только для админов)"""
     try:
-        success = crud_category.delete_category(db, category_id)
+        # Подкатегории удаляются каскадно: сбросить карточки товаров поддерева
+        tree = await db.run_sync(category_tree_index.get)
+        subtree_ids = (
+            tree.subtree_ids(category_id) if category_id in tree else [category_id]
+        )
+        success = await db.run_sync(crud_category.delete_category, category_id)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Категория не найдена"
             )
-        return {"message": "Категория успешно удалена"}
     except HTTPException:
         raise
     except Exception:
@@ -153,3 +241,7 @@ def delete_category(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Внутренняя ошибка сервера при удалении категории",
         )
+    await response_cache.invalidate(
+        "categories", *(f"category:{subtree_id}" for subtree_id in subtree_ids)
+    )
+    return {"message": "Категория успешно удалена"}
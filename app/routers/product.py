@@ -4,14 +4,28 @@ from fastapi import (
     HTTPException,
     status,
     Query,
+    Request,
+    Response,
     UploadFile,
     File,
     Form,
 )
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.database import get_db
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from app.database import get_async_db, get_async_read_db
 from app.core.auth import require_admin_role
+from app.core.cache import product_tags, response_cache
+from app.core.conditional import (
+    check_conditional,
+    collection_etag,
+    latest,
+    make_etag,
+    not_modified,
+    validator_headers,
+)
+from app.core.pagination import NEXT_CURSOR_HEADER, next_cursor
+from app.core.serialization import json_response
 from app.crud import product as crud_product
 from app.crud import photo as crud_photo
 from app.schemas.product import (
@@ -19,12 +33,14 @@ from app.schemas.product import (
     ProductUpdate,
     ProductOut,
     ProductWithExtendedInfo,
+    ProductSuggestion,
 )
 from app.schemas.product_photo import (
     ProductPhotoUpdate,
     ProductPhotoOut,
     PhotoReorderRequest,
 )
+from app.services.product_projection import FIELDS, INCLUDES, ProductProjection
 from app.services.images import (
     save_product_image,
     delete_product_image,
@@ -34,27 +50,58 @@ from app.services.images import (
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
+CURSOR_DESCRIPTION = (
+    "Непрозрачный курсор следующей страницы из заголовка X-Next-Cursor "
+    "(при передаче параметр skip игнорируется)"
+)
+SORT_DESCRIPTION = "Поле сортировки: id, name, price (префикс '-' — по убыванию)"
+FIELDS_DESCRIPTION = (
+    f"Поля товара через запятую: {', '.join(FIELDS)}. "
+    "С fields или include связи отдаются только перечисленные в include"
+)
+INCLUDE_DESCRIPTION = f"Связи товара через запятую: {', '.join(INCLUDES)}"
+
 
 @router.get("", response_model=List[ProductWithExtendedInfo])
-def read_products_list(
+async def read_products_list(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    sort: str = Query("id", description=SORT_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include: Optional[str] = Query(None, description=INCLUDE_DESCRIPTION),
     product_type_sysname: Optional[str] = Query(
         None, description="Фильтр по типу товара (sysname типа товара)"
     ),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """Получить список всех товаров или с дополнительной информацией"""
     try:
+        projection = ProductProjection.from_query(fields, include)
         if product_type_sysname:
-            products = (
-                crud_product.get_products_by_product_type_sysname_with_extended_info(
-                    db, product_type_sysname, skip=skip, limit=limit
-                )
+            products = await db.run_sync(
+                crud_product.get_products_by_product_type_sysname_with_extended_info,
+                product_type_sysname,
+                skip=skip,
+                limit=limit,
+                cursor=cursor,
+                sort=sort,
+                projection=projection,
             )
         else:
-            products = crud_product.get_products(db, skip=skip, limit=limit)
-        return products
+            products = await db.run_sync(
+                crud_product.get_products,
+                skip=skip,
+                limit=limit,
+                cursor=cursor,
+                sort=sort,
+                projection=projection,
+            )
+        return _listing_response(request, response, products, sort, limit, projection)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -63,18 +110,33 @@ def read_products_list(
 
 
 @router.get("/category/{category_id}", response_model=List[ProductWithExtendedInfo])
-def get_products_by_category_id(
+async def get_products_by_category_id(
     category_id: int,
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    sort: str = Query("id", description=SORT_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include: Optional[str] = Query(None, description=INCLUDE_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """Получить товары по ID категории"""
     try:
-        products = crud_product.get_products_by_category_id_with_extended_info(
-            db, category_id, skip=skip, limit=limit
+        projection = ProductProjection.from_query(fields, include)
+        products = await db.run_sync(
+            crud_product.get_products_by_category_id_with_extended_info,
+            category_id,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            sort=sort,
+            projection=projection,
         )
-        return products
+        return _listing_response(request, response, products, sort, limit, projection)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -83,16 +145,41 @@ def get_products_by_category_id(
 
 
 @router.get("/search", response_model=List[ProductOut])
-def search_products(
+async def search_products(
     q: str = Query(..., min_length=1),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    mode: Literal["substring", "ranked"] = Query(
+        "substring",
+        description=(
+            "substring — вхождение подстроки в название или описание; "
+            "ranked — полнотекстовый поиск с сортировкой по релевантности"
+        ),
+    ),
+    fuzzy: bool = Query(
+        False,
+        description=(
+            "Нечёткий поиск по триграммам, устойчивый к опечаткам, "
+            "с сортировкой по похожести (параметр mode не учитывается)"
+        ),
+    ),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """Поиск товаров по названию или описанию"""
     try:
-        products = crud_product.search_products(db, q, skip=skip, limit=limit)
-        return products
+        if fuzzy:
+            products = await db.run_sync(
+                crud_product.search_products_fuzzy, q, skip=skip, limit=limit
+            )
+        elif mode == "ranked":
+            products = await db.run_sync(
+                crud_product.search_products_ranked, q, skip=skip, limit=limit
+            )
+        else:
+            products = await db.run_sync(
+                crud_product.search_products, q, skip=skip, limit=limit
+            )
+        return json_response(List[ProductOut], products)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -100,17 +187,51 @@ def search_products(
         )
 
 
+@router.get("/suggest", response_model=List[ProductSuggestion])
+async def suggest_products(
+    q: str = Query(..., min_length=1, description="Начало SKU или названия товара"),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Подсказки для поиска по мере ввода: id, название и SKU"""
+    try:
+        return await db.run_sync(crud_product.suggest_products, q, limit=limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка при получении подсказок: {str(e)}",
+        )
+
+
 @router.get("/{product_id}", response_model=ProductWithExtendedInfo)
-def get_product(product_id: int, db: Session = Depends(get_db)):
+async def get_product(
+    product_id: int, request: Request, db: AsyncSession = Depends(get_async_read_db)
+):
     """Получить товар по ID с дополнительной информацией"""
     try:
-        product = crud_product.get_product_with_extended_info(db, product_id)
+        version = await db.run_sync(crud_product.get_product_version, product_id)
+        if version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Товар с ID {product_id} не найден",
+            )
+        etag, last_modified = _product_validators(version)
+        unchanged = not_modified(request, etag, last_modified)
+        if unchanged is not None:
+            return unchanged
+        headers = validator_headers(etag, last_modified)
+        cached = await response_cache.get(request, etag, headers)
+        if cached is not None:
+            return cached
+
+        product = await db.run_sync(
+            crud_product.get_product_with_extended_info, product_id
+        )
         if not product:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Товар с ID {product_id} не найден",
             )
-        return product
     except HTTPException:
         raise
     except Exception as e:
@@ -118,18 +239,43 @@ def get_product(product_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при получении товара: {str(e)}",
         )
+    return await response_cache.store(
+        request,
+        ProductWithExtendedInfo,
+        product,
+        product_tags(product),
+        etag,
+        headers,
+    )
 
 
 @router.get("/sku/{sku}", response_model=ProductWithExtendedInfo)
-def get_product_by_sku(sku: str, db: Session = Depends(get_db)):
+async def get_product_by_sku(
+    sku: str, request: Request, db: AsyncSession = Depends(get_async_read_db)
+):
     """Получить товар по SKU с дополнительной информацией"""
     try:
-        product = crud_product.get_product_by_sku_with_extended_info(db, sku)
+        version = await db.run_sync(crud_product.get_product_version_by_sku, sku)
+        if version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
+            )
+        etag, last_modified = _product_validators(version)
+        unchanged = not_modified(request, etag, last_modified)
+        if unchanged is not None:
+            return unchanged
+        headers = validator_headers(etag, last_modified)
+        cached = await response_cache.get(request, etag, headers)
+        if cached is not None:
+            return cached
+
+        product = await db.run_sync(
+            crud_product.get_product_by_sku_with_extended_info, sku
+        )
         if not product:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
             )
-        return product
     except HTTPException:
         raise
     except Exception as e:
@@ -137,6 +283,14 @@ def get_product_by_sku(sku: str, db: Session = Depends(get_db)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при получении товара: {str(e)}",
         )
+    return await response_cache.store(
+        request,
+        ProductWithExtendedInfo,
+        product,
+        product_tags(product),
+        etag,
+        headers,
+    )
 
 
 @router.post(
@@ -144,13 +298,13 @@ def get_product_by_sku(sku: str, db: Session = Depends(get_db)):
     response_model=ProductOut,
     dependencies=[Depends(require_admin_role)],
 )
-def create_product(
+async def create_product(
     product: ProductCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Создать новый товар (только для админов)"""
     try:
-        return crud_product.create_product(db, product)
+        created = await db.run_sync(crud_product.create_product, product)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -158,6 +312,10 @@ def create_product(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Внутренняя ошибка сервера: {str(e)}",
         )
+    if created.category_id is not None:
+        # Счётчики товаров в дереве категорий
+        await response_cache.invalidate("categories")
+    return created
 
 
 @router.put(
@@ -165,20 +323,21 @@ def create_product(
     response_model=ProductOut,
     dependencies=[Depends(require_admin_role)],
 )
-def update_product(
+async def update_product(
     product_id: int,
     product: ProductUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Обновить товар (только для админов)"""
     try:
-        updated_product = crud_product.update_product(db, product_id, product)
+        updated_product = await db.run_sync(
+            crud_product.update_product, product_id, product
+        )
         if not updated_product:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Товар с ID {product_id} не найден",
             )
-        return updated_product
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except HTTPException:
@@ -188,25 +347,29 @@ def update_product(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при обновлении товара: {str(e)}",
         )
+    tags = [f"product:{product_id}"]
+    if "category_id" in product.model_fields_set:
+        tags.append("categories")
+    await response_cache.invalidate(*tags)
+    return updated_product
 
 
 @router.delete(
     "/{product_id}",
     dependencies=[Depends(require_admin_role)],
 )
-def delete_product(
+async def delete_product(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Удалить товар (только для админов)"""
     try:
-        success = crud_product.delete_product(db, product_id)
+        success = await db.run_sync(crud_product.delete_product, product_id)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Товар с ID {product_id} не найден",
             )
-        return {"message": "Товар успешно удален"}
     except HTTPException:
         raise
     except Exception as e:
@@ -214,19 +377,91 @@ def delete_product(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при удалении товара: {str(e)}",
         )
+    await response_cache.invalidate(f"product:{product_id}", "categories")
+    return {"message": "Товар успешно удален"}
+
+
+def _set_next_cursor(response: Response, products, sort: str, limit: int) -> None:
+    """Вернуть курсор следующей страницы в заголовке ответа"""
+    cursor = next_cursor(products, sort, crud_product.PRODUCT_SORT_COLUMNS, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+
+
+def _listing_response(
+    request: Request,
+    response: Response,
+    products,
+    sort: str,
+    limit: int,
+    projection: Optional[ProductProjection],
+) -> Response:
+    """Ответ списка товаров: 304 по ETag или JSON с курсором следующей страницы"""
+    if projection is None:
+        etag = collection_etag(map(_listing_version, products))
+        response_type = List[ProductWithExtendedInfo]
+    else:
+        versions = (
+            (
+                _listing_version(product)
+                if projection.loads_category
+                else (product.id, product.updated_at or product.created_at)
+            )
+            for product in products
+        )
+        etag = collection_etag(versions, projection.key)
+        response_type = projection.response_type
+    unchanged = check_conditional(request, response, etag)
+    if unchanged is not None:
+        return unchanged
+    _set_next_cursor(response, products, sort, limit)
+    return json_response(response_type, products, response)
+
+
+def _product_validators(version):
+    """ETag и Last-Modified карточки товара по строке версии из crud"""
+    etag = make_etag("product", *version)
+    return etag, latest(*version[1:])
+
+
+def _listing_version(product) -> tuple:
+    """Версия товара в списке: он сам, его категория и тип товара категории"""
+    category = product.category
+    product_type = category.product_type if category else None
+    return (
+        product.id,
+        product.updated_at or product.created_at,
+        category.updated_at if category else None,
+        product_type.updated_at if product_type else None,
+    )
 
 
 # ===== ФОТОГРАФИИ ТОВАРОВ =====
 
 
 @router.get("/{product_id}/photos", response_model=List[ProductPhotoOut])
-def get_product_photos(product_id: int, db: Session = Depends(get_db)):
-    product = crud_product.get_product(db, product_id)
-    if not product:
+async def get_product_photos(
+    product_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    version = await db.run_sync(crud_product.get_product_version, product_id)
+    if version is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
         )
-    return crud_photo.get_photos_by_product(db, product_id)
+    # Изменения фото обновляют updated_at товара
+    unchanged = check_conditional(
+        request,
+        response,
+        make_etag("photos", version.id, version.updated_at),
+        version.updated_at,
+    )
+    if unchanged is not None:
+        return unchanged
+    photos = await db.run_sync(crud_photo.get_photos_by_product, product_id)
+    return json_response(List[ProductPhotoOut], photos, response)
 
 
 @router.post(
@@ -238,9 +473,9 @@ async def upload_product_photo(
     file: UploadFile = File(...),
     is_main: bool = Form(False),
     sort_order: int = Form(0),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    product = crud_product.get_product(db, product_id)
+    product = await db.run_sync(crud_product.get_product, product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
@@ -254,9 +489,12 @@ async def upload_product_photo(
 
     filename = generate_unique_filename(product_id, file.filename)
     try:
-        file_path, thumb_path = save_product_image(file, product_id, filename)
-        photo = crud_photo.create_photo(
-            db,
+        # Запись файла и миниатюра (Pillow) блокируют — выполняются в пуле потоков
+        file_path, thumb_path = await run_in_threadpool(
+            save_product_image, file, product_id, filename
+        )
+        photo = await db.run_sync(
+            crud_photo.create_photo,
             product_id=product_id,
             filename=filename,
             filepath=file_path,
@@ -264,22 +502,25 @@ async def upload_product_photo(
             is_main=is_main,
             sort_order=sort_order,
         )
-        return photo
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to upload file: {str(e)}",
         )
+    await response_cache.invalidate(f"product:{product_id}")
+    return photo
 
 
 @router.get("/{product_id}/photos/{photo_id}", response_model=ProductPhotoOut)
-def get_product_photo(product_id: int, photo_id: int, db: Session = Depends(get_db)):
-    product = crud_product.get_product(db, product_id)
+async def get_product_photo(
+    product_id: int, photo_id: int, db: AsyncSession = Depends(get_async_read_db)
+):
+    product = await db.run_sync(crud_product.get_product, product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
         )
-    photo = crud_photo.get_photo(db, photo_id, product_id)
+    photo = await db.run_sync(crud_photo.get_photo, photo_id, product_id)
     if not photo:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Photo not found"
@@ -292,29 +533,30 @@ def get_product_photo(product_id: int, photo_id: int, db: Session = Depends(get_
     response_model=ProductPhotoOut,
     dependencies=[Depends(require_admin_role)],
 )
-def update_product_photo(
+async def update_product_photo(
     product_id: int,
     photo_id: int,
     photo_update: ProductPhotoUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    product = crud_product.get_product(db, product_id)
+    product = await db.run_sync(crud_product.get_product, product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
         )
-    photo = crud_photo.get_photo(db, photo_id, product_id)
+    photo = await db.run_sync(crud_photo.get_photo, photo_id, product_id)
     if not photo:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Photo not found"
         )
 
-    updated = crud_photo.update_photo(
-        db,
+    updated = await db.run_sync(
+        crud_photo.update_photo,
         photo,
         is_main=photo_update.is_main,
         sort_order=photo_update.sort_order,
     )
+    await response_cache.invalidate(f"product:{product_id}")
     return updated
 
 
@@ -322,24 +564,25 @@ def update_product_photo(
     "/{product_id}/photos/{photo_id}",
     dependencies=[Depends(require_admin_role)],
 )
-def delete_product_photo(
+async def delete_product_photo(
     product_id: int,
     photo_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    product = crud_product.get_product(db, product_id)
+    product = await db.run_sync(crud_product.get_product, product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
         )
-    photo = crud_photo.get_photo(db, photo_id, product_id)
+    photo = await db.run_sync(crud_photo.get_photo, photo_id, product_id)
     if not photo:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Photo not found"
         )
 
-    delete_product_image(photo.filepath, photo.thumbpath)
-    crud_photo.delete_photo(db, photo)
+    await run_in_threadpool(delete_product_image, photo.filepath, photo.thumbpath)
+    await db.run_sync(crud_photo.delete_photo, photo)
+    await response_cache.invalidate(f"product:{product_id}")
     return {"message": "Photo deleted successfully"}
 
 
@@ -347,23 +590,24 @@ def delete_product_photo(
     "/{product_id}/photos/{photo_id}/set-main",
     dependencies=[Depends(require_admin_role)],
 )
-def set_main_photo(
+async def set_main_photo(
     product_id: int,
     photo_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    product = crud_product.get_product(db, product_id)
+    product = await db.run_sync(crud_product.get_product, product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
         )
-    photo = crud_photo.get_photo(db, photo_id, product_id)
+    photo = await db.run_sync(crud_photo.get_photo, photo_id, product_id)
     if not photo:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Photo not found"
         )
 
-    crud_photo.update_photo(db, photo, is_main=True)
+    await db.run_sync(crud_photo.update_photo, photo, is_main=True)
+    await response_cache.invalidate(f"product:{product_id}")
     return {"message": "Main photo set successfully"}
 
 
@@ -371,15 +615,16 @@ def set_main_photo(
     "/{product_id}/photos/reorder",
     dependencies=[Depends(require_admin_role)],
 )
-def reorder_photos(
+async def reorder_photos(
     product_id: int,
     body: PhotoReorderRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    product = crud_product.get_product(db, product_id)
+    product = await db.run_sync(crud_product.get_product, product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
         )
-    crud_photo.reorder_photos(db, product_id, body.photo_ids)
+    await db.run_sync(crud_photo.reorder_photos, product_id, body.photo_ids)
+    await response_cache.invalidate(f"product:{product_id}")
     return {"message": "Photos reordered successfully"}
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.database import get_db
+from app.database import get_async_db, get_async_read_db
 from app.crud import product_type as crud_product_type
 from app.schemas.product_type import (
     ProductTypeCreate,
@@ -9,6 +9,13 @@ from app.schemas.product_type import (
     ProductTypeOut,
 )
 from app.core.auth import require_admin_role
+from app.core.cache import response_cache
+from app.core.conditional import (
+    collection_etag,
+    make_etag,
+    not_modified,
+    validator_headers,
+)
 
 router = APIRouter(prefix="/product-types", tags=["product-types"])
 
@@ -19,10 +26,14 @@ router = APIRouter(prefix="/product-types", tags=["product-types"])
     status_code=status.HTTP_201_CREATED,
     dependencies=[Depends(require_admin_role)],
 )
-def create_product_type(product_type: ProductTypeCreate, db: Session = Depends(get_db)):
+async def create_product_type(
+    product_type: ProductTypeCreate, db: AsyncSession = Depends(get_async_db)
+):
     """Создать новый тип товара"""
     try:
-        return crud_product_type.create_product_type(db=db, product_type=product_type)
+        created = await db.run_sync(
+            crud_product_type.create_product_type, product_type=product_type
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -33,34 +44,61 @@ def create_product_type(product_type: ProductTypeCreate, db: Session = Depends(g
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Внутренняя ошибка сервера: {str(e)}",
         )
+    await response_cache.invalidate("product_types")
+    return created
 
 
 @router.get("", response_model=List[ProductTypeOut])
-def read_product_types(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def read_product_types(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_async_read_db),
+):
     """Получить список типов товаров"""
     try:
-        product_types = crud_product_type.get_product_types(db, skip=skip, limit=limit)
-        return product_types
+        product_types = await db.run_sync(
+            crud_product_type.get_product_types, skip=skip, limit=limit
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при получении типов товаров: {str(e)}",
         )
+    etag = collection_etag((pt.id, pt.updated_at) for pt in product_types)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    headers = validator_headers(etag)
+    cached = await response_cache.get(request, etag, headers)
+    if cached is not None:
+        return cached
+    return await response_cache.store(
+        request,
+        List[ProductTypeOut],
+        product_types,
+        ["product_types"],
+        etag,
+        headers,
+    )
 
 
 @router.get("/{product_type_id}", response_model=ProductTypeOut)
-def read_product_type(product_type_id: int, db: Session = Depends(get_db)):
+async def read_product_type(
+    product_type_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+):
     """Получить тип товара по ID"""
     try:
-        product_type = crud_product_type.get_product_type(
-            db, product_type_id=product_type_id
+        product_type = await db.run_sync(
+            crud_product_type.get_product_type, product_type_id=product_type_id
         )
         if product_type is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Тип товара с ID {product_type_id} не найден",
             )
-        return product_type
     except HTTPException:
         raise
     except Exception as e:
@@ -68,21 +106,23 @@ def read_product_type(product_type_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при получении типа товара: {str(e)}",
         )
+    return await _conditional_product_type(request, product_type)
 
 
 @router.get("/by-sysname/{sysname}", response_model=ProductTypeOut)
-def read_product_type_by_sysname(sysname: str, db: Session = Depends(get_db)):
+async def read_product_type_by_sysname(
+    sysname: str, request: Request, db: AsyncSession = Depends(get_async_read_db)
+):
     """Получить тип товара по sysname"""
     try:
-        product_type = crud_product_type.get_product_type_by_sysname(
-            db, sysname=sysname
+        product_type = await db.run_sync(
+            crud_product_type.get_product_type_by_sysname, sysname=sysname
         )
         if product_type is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Тип товара с sysname '{sysname}' не найден",
             )
-        return product_type
     except HTTPException:
         raise
     except Exception as e:
@@ -90,6 +130,27 @@ def read_product_type_by_sysname(sysname: str, db: Session = Depends(get_db)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при получении типа товара: {str(e)}",
         )
+    return await _conditional_product_type(request, product_type)
+
+
+async def _conditional_product_type(request: Request, product_type):
+    """Тип товара из кэша ответов или 304, если у клиента актуальная версия"""
+    etag = make_etag("product_type", product_type.id, product_type.updated_at)
+    unchanged = not_modified(request, etag, product_type.updated_at)
+    if unchanged is not None:
+        return unchanged
+    headers = validator_headers(etag, product_type.updated_at)
+    cached = await response_cache.get(request, etag, headers)
+    if cached is not None:
+        return cached
+    return await response_cache.store(
+        request,
+        ProductTypeOut,
+        product_type,
+        [f"product_type:{product_type.id}"],
+        etag,
+        headers,
+    )
 
 
 @router.put(
@@ -97,22 +158,23 @@ def read_product_type_by_sysname(sysname: str, db: Session = Depends(get_db)):
     response_model=ProductTypeOut,
     dependencies=[Depends(require_admin_role)],
 )
-def update_product_type(
+async def update_product_type(
     product_type_id: int,
     product_type: ProductTypeUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Обновить тип товара"""
     try:
-        db_product_type = crud_product_type.update_product_type(
-            db, product_type_id=product_type_id, product_type=product_type
+        db_product_type = await db.run_sync(
+            crud_product_type.update_product_type,
+            product_type_id=product_type_id,
+            product_type=product_type,
         )
         if db_product_type is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Тип товара с ID {product_type_id} не найден",
             )
-        return db_product_type
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -125,6 +187,9 @@ def update_product_type(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при обновлении типа товара: {str(e)}",
         )
+    # Тег типа есть и у карточек товаров его категорий (sysname в ответе)
+    await response_cache.invalidate("product_types", f"product_type:{product_type_id}")
+    return db_product_type
 
 
 @router.delete(
@@ -132,18 +197,19 @@ def update_product_type(
     status_code=status.HTTP_204_NO_CONTENT,
     dependencies=[Depends(require_admin_role)],
 )
-def delete_product_type(product_type_id: int, db: Session = Depends(get_db)):
+async def delete_product_type(
+    product_type_id: int, db: AsyncSession = Depends(get_async_db)
+):
     """Удалить тип товара"""
     try:
-        success = crud_product_type.delete_product_type(
-            db, product_type_id=product_type_id
+        success = await db.run_sync(
+            crud_product_type.delete_product_type, product_type_id=product_type_id
         )
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Тип товара с ID {product_type_id} не найден",
             )
-        return None
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -156,3 +222,5 @@ def delete_product_type(product_type_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при удалении типа товара: {str(e)}",
         )
+    await response_cache.invalidate("product_types", f"product_type:{product_type_id}")
+    return None
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from app.database import get_db
+from app.database import get_async_db
 from app.schemas.role import RoleCreate, RoleUpdate, RoleOut
 from app.crud import role as crud_role
 from app.core.auth import require_admin_role
@@ -12,22 +12,22 @@ router = APIRouter(prefix="/roles", tags=["roles"])
 
 
 @router.post("", response_model=RoleOut, dependencies=[Depends(require_admin_role)])
-def create_role(
+async def create_role(
     role: RoleCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Создать новую роль (только для администраторов)"""
     # Проверка на дубликат имени
-    existing = crud_role.get_role_by_name(db, role.name)
+    existing = await db.run_sync(crud_role.get_role_by_name, role.name)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Role with the same name already exists",
         )
     try:
-        return crud_role.create_role(db, role)
+        return await db.run_sync(crud_role.create_role, role)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Role with the same name already exists",
@@ -35,15 +35,17 @@ def create_role(
 
 
 @router.get("", response_model=List[RoleOut])
-def read_roles(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def read_roles(
+    skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)
+):
     """Получить список ролей (публичный доступ)"""
-    return crud_role.get_roles(db, skip=skip, limit=limit)
+    return await db.run_sync(crud_role.get_roles, skip=skip, limit=limit)
 
 
 @router.get("/{role_id}", response_model=RoleOut)
-def read_role(role_id: int, db: Session = Depends(get_db)):
+async def read_role(role_id: int, db: AsyncSession = Depends(get_async_db)):
     """Получить роль по ID (публичный доступ)"""
-    db_role = crud_role.get_role(db, role_id)
+    db_role = await db.run_sync(crud_role.get_role, role_id)
     if db_role is None:
         raise HTTPException(status_code=404, detail="Role not found")
     return db_role
@@ -52,25 +54,25 @@ def read_role(role_id: int, db: Session = Depends(get_db)):
 @router.patch(
     "/{role_id}", response_model=RoleOut, dependencies=[Depends(require_admin_role)]
 )
-def update_role(
+async def update_role(
     role_id: int,
     role: RoleUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Обновить роль (только для администраторов)"""
     # Если обновляется имя, проверяем дубликаты
     update_data = role.model_dump(exclude_unset=True)
     if "name" in update_data:
-        existing = crud_role.get_role_by_name(db, update_data["name"])
+        existing = await db.run_sync(crud_role.get_role_by_name, update_data["name"])
         if existing and existing.id != role_id:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="Role with the same name already exists",
             )
     try:
-        updated = crud_role.update_role(db, role_id, role)
+        updated = await db.run_sync(crud_role.update_role, role_id, role)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Role with the same name already exists",
@@ -81,12 +83,12 @@ def update_role(
 
 
 @router.delete("/{role_id}", dependencies=[Depends(require_admin_role)])
-def delete_role(
+async def delete_role(
     role_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Удалить роль (только для администраторов)"""
-    deleted = crud_role.delete_role(db, role_id)
+    deleted = await db.run_sync(crud_role.delete_role, role_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Role not found")
     return {"message": "Role deleted successfully"}
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import List, Optional
 from decimal import Decimal
 
 
@@ -30,6 +30,37 @@ class CarpetOut(CarpetBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class FacetValue(BaseModel):
+    """Значение фасета и количество ковров с ним"""
+
+    value: str
+    count: int
+
+
+class FacetRange(BaseModel):
+    """Корзина диапазона [min, max); отсутствующая граница — открытый интервал"""
+
+    min: Optional[Decimal] = None
+    max: Optional[Decimal] = None
+    count: int
+
+
+class CarpetFacets(BaseModel):
+    material: List[FacetValue] = []
+    origin: List[FacetValue] = []
+    width: List[FacetRange] = []
+    length: List[FacetRange] = []
+    price: List[FacetRange] = []
+
+
+class CarpetFacetedSearch(BaseModel):
+    """Страница ковров, общее количество и фасеты по текущим фильтрам"""
+
+    total: int
+    items: List[CarpetOut]
+    facets: CarpetFacets
+
+
 class CarpetWithProduct(CarpetOut):
     product: "ProductOut"
 
@@ -31,6 +31,8 @@ class CategoryOut(CategoryBase):
 
 class CategoryWithComputed(CategoryOut):
     is_leaf: bool = False
+    product_count: int = 0
+    subtree_product_count: int = 0
     children: List["CategoryWithComputed"] = Field(default_factory=list)
 
 
@@ -127,3 +127,13 @@ class ProductWithExtendedInfo(ProductOut):
     extended_info: Optional[Dict[str, Any]] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class ProductSuggestion(BaseModel):
+    """Подсказка поиска: только идентификация товара, без фото и связей"""
+
+    id: int
+    name: str
+    sku: str
+
+    model_config = ConfigDict(from_attributes=True)
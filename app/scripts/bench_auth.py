@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк проверки прав администратора:
+- по базе: пользователь и его роли (get_current_user, кэш principal_cache)
+- по токену: claim roles и версия ролей из кэша (get_token_principal)
+
+Выводит число SQL-запросов и среднее время на одну проверку, отдельно
+с пустым кэшем и с заполненным.
+
+Запуск (нужен пользователь с ролью admin, см. app/scripts/seeds.py):
+    python -m app.scripts.bench_auth --email admin@example.com
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import AsyncSessionLocal, SessionLocal
+from app.models.user import User
+from app.core.query_counter import QueryCounter
+from app.core.auth import (
+    create_access_token,
+    decode_token,
+    forget_users,
+    get_current_user,
+    get_token_principal,
+)
+
+
+def check_by_db(token: str, repeat: int, cold: bool) -> None:
+    user_id = decode_token(token)["user_id"]
+    for _ in range(repeat):
+        if cold:
+            forget_users([user_id])
+        db = SessionLocal()
+        try:
+            user = get_current_user(token, db)
+            if not any(role.name == "admin" for role in user.roles):
+                raise RuntimeError("У пользователя нет роли admin")
+        finally:
+            db.close()
+
+
+async def check_by_token(token: str, repeat: int, cold: bool) -> None:
+    user_id = decode_token(token)["user_id"]
+    for _ in range(repeat):
+        if cold:
+            forget_users([user_id])
+        async with AsyncSessionLocal() as db:
+            payload = await get_token_principal(decode_token(token), db)
+        if "admin" not in payload["roles"]:
+            raise RuntimeError("В токене нет роли admin")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--email", default=os.getenv("ADMIN_EMAIL", "admin@example.com")
+    )
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == args.email).first()
+        if user is None:
+            print(f"Пользователь {args.email} не найден")
+            return
+        token = create_access_token(
+            {"user_id": user.id, "roles": user.role_names, "rv": user.roles_version}
+        )
+    finally:
+        db.close()
+
+    cases = (
+        ("по базе, пустой кэш", lambda: check_by_db(token, args.repeat, cold=True)),
+        ("по базе, кэш", lambda: check_by_db(token, args.repeat, cold=False)),
+        (
+            "по токену, пустой кэш",
+            lambda: asyncio.run(check_by_token(token, args.repeat, cold=True)),
+        ),
+        (
+            "по токену, кэш",
+            lambda: asyncio.run(check_by_token(token, args.repeat, cold=False)),
+        ),
+    )
+    for name, run in cases:
+        with QueryCounter() as counter:
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+        print(
+            f"{name:>22}: {counter.count / args.repeat:5.2f} запросов, "
+            f"{elapsed / args.repeat * 1_000_000:8.1f} мкс на проверку"
+        )
+
+
+if __name__ == "__main__":
+    main()
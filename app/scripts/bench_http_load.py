@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный бенчмарк HTTP API: N одновременных keep-alive соединений
+в течение заданного времени, запросы по кругу из списка путей.
+Выводит пропускную способность (запросов/с), p50/p99 задержки и число ошибок.
+
+Клиент написан на asyncio без сторонних зависимостей, чтобы сам генератор
+нагрузки не упирался в пул потоков. Для сравнения синхронного и асинхронного
+слоя БД запустите API из двух ревизий и прогоните бенчмарк против каждой:
+    uvicorn app.main:app --port 8000 --workers 1
+    python -m app.scripts.bench_http_load --url http://127.0.0.1:8000 \\
+        --concurrency 500 --duration 30
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Tuple
+from urllib.parse import quote, urlsplit
+
+DEFAULT_PATHS = [
+    "/products?limit=20",
+    "/products?limit=20&sort=-price",
+    "/products/category/1?limit=20",
+    "/products/search?q=ковер&limit=20",
+    "/products/suggest?q=ко",
+    "/categories/tree",
+    "/carpets/facets?limit=20",
+]
+
+
+async def read_response(reader: asyncio.StreamReader) -> int:
+    """Прочитать ответ HTTP/1.1 целиком, вернуть код статуса"""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status
+
+
+async def worker(
+    host: str,
+    port: int,
+    prefix: str,
+    paths: List[str],
+    offset: int,
+    deadline: float,
+    timeout: float,
+    latencies: List[float],
+    errors: List[str],
+) -> None:
+    """Одно соединение: запросы подряд до истечения времени"""
+    reader = writer = None
+    index = offset
+    while time.perf_counter() < deadline:
+        path = quote(prefix + paths[index % len(paths)], safe="/?&=-_.,")
+        index += 1
+        request = (
+            f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+            "Connection: keep-alive\r\nAccept: application/json\r\n\r\n"
+        ).encode()
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            await writer.drain()
+            status = await asyncio.wait_for(read_response(reader), timeout)
+        except (
+            OSError,
+            asyncio.IncompleteReadError,
+            asyncio.TimeoutError,
+            ValueError,
+        ) as e:
+            errors.append(type(e).__name__)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+        if status >= 400:
+            errors.append(str(status))
+    if writer is not None:
+        writer.close()
+
+
+async def run(
+    url: str, paths: List[str], concurrency: int, duration: float, timeout: float
+) -> Tuple[List[float], List[str], float]:
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    prefix = parts.path.rstrip("/")
+    latencies: List[float] = []
+    errors: List[str] = []
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(
+        *[
+            worker(host, port, prefix, paths, i, deadline, timeout, latencies, errors)
+            for i in range(concurrency)
+        ]
+    )
+    return latencies, errors, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=30,
+        help="таймаут ответа, с (считается ошибкой)",
+    )
+    parser.add_argument(
+        "--path", action="append", dest="paths", help="путь запроса (можно несколько)"
+    )
+    args = parser.parse_args()
+    paths = args.paths or DEFAULT_PATHS
+
+    latencies, errors, elapsed = asyncio.run(
+        run(args.url, paths, args.concurrency, args.duration, args.timeout)
+    )
+    if not latencies:
+        print(f"Нет успешных ответов, ошибок: {len(errors)}")
+        return
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(f"соединений: {args.concurrency}, время: {elapsed:.1f} с")
+    print(f"запросов: {len(latencies)}, {len(latencies) / elapsed:.1f} запр/с")
+    print(
+        f"задержка: p50 {statistics.median(latencies):.1f} мс, "
+        f"p99 {percentiles[98]:.1f} мс"
+    )
+    if errors:
+        counts = {error: errors.count(error) for error in set(errors)}
+        print(f"ошибок: {len(errors)} {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарк проверки JWT:
+- jwt.decode без кэша для HS256, RS256 и ES256 (ключи RS256/ES256
+  генерируются на время запуска)
+- decode_token с настройками из .env: пустой кэш (каждый раз проверка
+  подписи) и заполненный (sha256 токена и поиск в token_cache)
+
+Выводит среднее время на токен в микросекундах и hit ratio token_cache.
+
+Запуск:
+    python -m app.scripts.bench_jwt_decode --repeat 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from app.core.auth import create_access_token, decode_token, token_cache
+
+CLAIMS = {"user_id": 1, "roles": ["admin"], "rv": 0}
+
+
+def signing_keys():
+    """Алгоритм -> (ключ подписи, ключ проверки)"""
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+    return {
+        "HS256": ("bench-secret-" + "x" * 32, "bench-secret-" + "x" * 32),
+        "RS256": (rsa_key, rsa_key.public_key()),
+        "ES256": (ec_key, ec_key.public_key()),
+    }
+
+
+def measure(fn, repeat: int) -> float:
+    """Среднее время fn в микросекундах"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    claims = {**CLAIMS, "exp": datetime.utcnow() + timedelta(minutes=30)}
+    for algorithm, (private_key, public_key) in signing_keys().items():
+        token = jwt.encode(claims, private_key, algorithm=algorithm)
+        elapsed = measure(
+            lambda: jwt.decode(token, public_key, algorithms=[algorithm]),
+            args.repeat,
+        )
+        print(f"{'jwt.decode ' + algorithm:>24}: {elapsed:8.1f} мкс/токен")
+
+    token = create_access_token(CLAIMS)
+
+    def cold():
+        token_cache.clear()
+        decode_token(token)
+
+    print(
+        f"{'decode_token, пустой кэш':>24}: {measure(cold, args.repeat):8.1f} мкс/токен"
+    )
+    elapsed = measure(lambda: decode_token(token), args.repeat)
+    print(f"{'decode_token, кэш':>24}: {elapsed:8.1f} мкс/токен")
+    print(f"token_cache: {token_cache.snapshot()}")
+
+
+if __name__ == "__main__":
+    main()
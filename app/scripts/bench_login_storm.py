@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест: задержка чтения каталога во время шквала входов.
+
+Два прогона по --duration секунд против запущенного API:
+1. только GET-запросы каталога (--concurrency соединений);
+2. те же GET-запросы и одновременно --logins соединений, отправляющих
+   POST /auth/login подряд.
+Для каталога выводятся p50/p99 в обоих прогонах, для входов — коды ответов
+(503 — пул хеширования паролей переполнен).
+
+    uvicorn app.main:app --port 8000 --workers 1
+    python -m app.scripts.bench_login_storm --url http://127.0.0.1:8000 \\
+        --email admin@example.com --password ... --logins 50
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+from typing import List
+from urllib.parse import urlsplit
+
+from app.scripts.bench_http_load import DEFAULT_PATHS, read_response, worker
+
+
+async def login_worker(
+    host: str,
+    port: int,
+    prefix: str,
+    body: bytes,
+    deadline: float,
+    timeout: float,
+    statuses: Counter,
+) -> None:
+    """Одно соединение: POST /auth/login подряд до истечения времени"""
+    reader = writer = None
+    request = (
+        f"POST {prefix}/auth/login HTTP/1.1\r\nHost: {host}\r\n"
+        "Connection: keep-alive\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    ).encode() + body
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            await writer.drain()
+            status = await asyncio.wait_for(read_response(reader), timeout)
+        except (
+            OSError,
+            asyncio.IncompleteReadError,
+            asyncio.TimeoutError,
+            ValueError,
+        ) as e:
+            statuses[type(e).__name__] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            continue
+        statuses[str(status)] += 1
+        if status == 503:
+            # Retry-After: клиент не долбит перегруженный сервер
+            await asyncio.sleep(1)
+    if writer is not None:
+        writer.close()
+
+
+async def run(args, logins: int):
+    parts = urlsplit(args.url)
+    host, port = parts.hostname, parts.port or 80
+    prefix = parts.path.rstrip("/")
+    body = json.dumps({"email": args.email, "password": args.password}).encode()
+    latencies: List[float] = []
+    errors: List[str] = []
+    statuses: Counter = Counter()
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(
+        *[
+            worker(
+                host,
+                port,
+                prefix,
+                DEFAULT_PATHS,
+                i,
+                deadline,
+                args.timeout,
+                latencies,
+                errors,
+            )
+            for i in range(args.concurrency)
+        ],
+        *[
+            login_worker(host, port, prefix, body, deadline, args.timeout, statuses)
+            for _ in range(logins)
+        ],
+    )
+    return latencies, errors, statuses
+
+
+def report(name: str, latencies: List[float], errors: List[str], duration: float):
+    if len(latencies) < 2:
+        print(f"{name}: нет успешных ответов каталога, ошибок: {len(errors)}")
+        return
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name}: {len(latencies) / duration:.1f} запр/с, "
+        f"p50 {statistics.median(latencies):.1f} мс, p99 {percentiles[98]:.1f} мс, "
+        f"ошибок {len(errors)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", default="admin@example.com")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    latencies, errors, _ = asyncio.run(run(args, logins=0))
+    report("каталог без входов", latencies, errors, args.duration)
+    latencies, errors, statuses = asyncio.run(run(args, logins=args.logins))
+    report("каталог во время входов", latencies, errors, args.duration)
+    print(f"входы: {dict(sorted(statuses.items()))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк стоимости хеширования паролей на текущем CPU.
+
+Для каждого уровня стоимости bcrypt (rounds) и argon2id (time cost при
+PASSWORD_ARGON2_MEMORY_KIB и PASSWORD_ARGON2_PARALLELISM) выводит медиану
+миллисекунд на хеш и сколько входов в секунду выдержит пул из
+PASSWORD_HASH_WORKERS процессов (не больше одного хеша на ядро за раз).
+Текущие настройки отмечены звёздочкой.
+
+Запуск на машине, где работает API:
+    python -m app.scripts.bench_password_hash --bcrypt-rounds 10,11,12,13,14
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passlib.hash import argon2, bcrypt
+from app.config import (
+    PASSWORD_ARGON2_MEMORY_KIB,
+    PASSWORD_ARGON2_PARALLELISM,
+    PASSWORD_ARGON2_TIME_COST,
+    PASSWORD_BCRYPT_ROUNDS,
+    PASSWORD_HASH_SCHEME,
+    PASSWORD_HASH_WORKERS,
+)
+
+
+def measure(handler, repeat: int) -> float:
+    """Медиана миллисекунд на хеш (первый вызов — прогрев бэкенда)"""
+    handler.hash("benchmark-password")
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        handler.hash("benchmark-password")
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def report(name: str, ms: float, current: bool) -> None:
+    mark = "*" if current else " "
+    parallel = min(PASSWORD_HASH_WORKERS, os.cpu_count() or 1)
+    print(
+        f"{mark} {name:>28}: {ms:8.1f} мс/хеш, "
+        f"{parallel * 1000 / ms:7.1f} входов/с на пул"
+    )
+
+
+def parse_levels(value: str):
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bcrypt-rounds", default="10,11,12,13,14")
+    parser.add_argument("--argon2-time-cost", default="1,2,3,4")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Процессов в пуле: {PASSWORD_HASH_WORKERS}, CPU: {os.cpu_count()}")
+    for rounds in parse_levels(args.bcrypt_rounds):
+        report(
+            f"bcrypt rounds={rounds}",
+            measure(bcrypt.using(rounds=rounds), args.repeat),
+            PASSWORD_HASH_SCHEME == "bcrypt" and rounds == PASSWORD_BCRYPT_ROUNDS,
+        )
+
+    if not argon2.has_backend():
+        print("argon2id: не установлен пакет argon2-cffi")
+        return
+    for time_cost in parse_levels(args.argon2_time_cost):
+        handler = argon2.using(
+            type="ID",
+            rounds=time_cost,
+            memory_cost=PASSWORD_ARGON2_MEMORY_KIB,
+            parallelism=PASSWORD_ARGON2_PARALLELISM,
+        )
+        report(
+            f"argon2id t={time_cost} m={PASSWORD_ARGON2_MEMORY_KIB}KiB",
+            measure(handler, args.repeat),
+            PASSWORD_HASH_SCHEME == "argon2" and time_cost == PASSWORD_ARGON2_TIME_COST,
+        )
+
+
+if __name__ == "__main__":
+    main()
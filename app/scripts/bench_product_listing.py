@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк выборки страниц списка товаров:
+- старый путь: joinedload(Product.photos) + OFFSET/LIMIT (одна широкая выборка)
+- новый путь: страница id + selectinload связей (crud.product.get_products)
+
+Запуск на отдельной базе (сидирование добавляет данные в таблицы):
+    python -m app.scripts.bench_product_listing --seed --products 100000 --photos 10
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session, joinedload
+from app.database import SessionLocal, engine
+from app.models.product import Product
+from app.crud import product as crud_product
+
+
+def seed(db: Session, products: int, photos: int) -> None:
+    """Заполнить базу товарами и фотографиями средствами generate_series"""
+    db.execute(
+        text(
+            """
+            INSERT INTO products (sku, price, name, description, amount)
+            SELECT 'BENCH-' || g, (g % 1000) + 0.99, 'Товар ' || g,
+                   'Описание товара ' || g, g % 50
+            FROM generate_series(1, :n) AS g
+            """
+        ),
+        {"n": products},
+    )
+    db.execute(
+        text(
+            """
+            INSERT INTO product_photos
+                (product_id, filename, filepath, thumbpath, is_main, sort_order)
+            SELECT p.id, p.id || '_' || k || '.jpg',
+                   'media/products/' || p.id || '/' || p.id || '_' || k || '.jpg',
+                   'media/products/' || p.id || '/thumb_' || p.id || '_' || k || '.jpg',
+                   k = 0, k
+            FROM products p CROSS JOIN generate_series(0, :k - 1) AS k
+            WHERE p.sku LIKE 'BENCH-%'
+            """
+        ),
+        {"k": photos},
+    )
+    db.commit()
+    db.execute(text("ANALYZE products"))
+    db.execute(text("ANALYZE product_photos"))
+    db.commit()
+
+
+def joined_page(db: Session, skip: int, limit: int):
+    """Исходная реализация выборки страницы"""
+    return (
+        db.query(Product)
+        .options(joinedload(Product.photos))
+        .order_by(Product.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+
+def two_phase_page(db: Session, skip: int, limit: int):
+    return crud_product.get_products(db, skip=skip, limit=limit)
+
+
+def measure(fn, skip: int, limit: int, repeat: int):
+    """Время выполнения (мс) и число строк, полученных из базы"""
+    stats = {"rows": 0}
+
+    def count_rows(conn, cursor, statement, parameters, context, executemany):
+        stats["rows"] += max(cursor.rowcount, 0)
+
+    event.listen(engine, "after_cursor_execute", count_rows)
+    timings = []
+    try:
+        for _ in range(repeat):
+            db = SessionLocal()
+            try:
+                stats["rows"] = 0
+                started = time.perf_counter()
+                fn(db, skip, limit)
+                timings.append((time.perf_counter() - started) * 1000)
+            finally:
+                db.close()
+    finally:
+        event.remove(engine, "after_cursor_execute", count_rows)
+    return statistics.median(timings), stats["rows"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seed", action="store_true")
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--photos", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.seed:
+        db = SessionLocal()
+        try:
+            seed(db, args.products, args.photos)
+        finally:
+            db.close()
+
+    print(f"{'skip':>8} | {'joinedload, мс':>15} {'строк':>7} | {'id+selectin, мс':>15} {'строк':>7}")
+    for skip in (0, 1_000, 10_000, 50_000, max(args.products - args.limit, 0)):
+        old_ms, old_rows = measure(joined_page, skip, args.limit, args.repeat)
+        new_ms, new_rows = measure(two_phase_page, skip, args.limit, args.repeat)
+        print(
+            f"{skip:>8} | {old_ms:>15.1f} {old_rows:>7} | {new_ms:>15.1f} {new_rows:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк поиска товаров: ILIKE '%q%' (триграммный GIN-индекс), полнотекстовый
+поиск (tsvector + GIN, ранжирование ts_rank), нечёткий поиск по триграммам
+и префиксные подсказки.
+Выводит p50 и p99 в миллисекундах.
+
+Запуск на отдельной базе (сидирование добавляет данные в таблицы):
+    python -m app.scripts.bench_search --seed --products 500000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.crud import product as crud_product
+
+# fmt: off
+WORDS = [
+    "ковер", "шерсть", "шелк", "иранский", "турецкий", "ручной", "работы",
+    "винтажный", "красный", "синий", "орнамент", "дорожка", "прикроватный",
+    "большой", "овальный", "carpet", "wool", "silk", "vintage", "handmade",
+    "persian", "runner", "modern", "classic", "beige", "pattern",
+]
+# fmt: on
+
+
+def seed(db: Session, products: int) -> None:
+    """Заполнить базу товарами со случайными названиями и описаниями из WORDS"""
+    db.execute(
+        text(
+            """
+            INSERT INTO products (sku, price, name, description, amount)
+            SELECT 'SEARCH-' || g,
+                   (g % 1000) + 0.99,
+                   w[1 + g % n] || ' ' || w[1 + (g / 7) % n] || ' ' || g,
+                   w[1 + (g / 3) % n] || ' ' || w[1 + (g / 11) % n] || ' '
+                       || w[1 + (g / 13) % n] || ' ' || w[1 + (g / 17) % n],
+                   g % 50
+            FROM generate_series(1, :count) AS g,
+                 (SELECT CAST(:words AS text[]) AS w,
+                         cardinality(CAST(:words AS text[])) AS n) AS vocabulary
+            """
+        ),
+        {"count": products, "words": WORDS},
+    )
+    db.commit()
+    db.execute(text("ANALYZE products"))
+    db.commit()
+
+
+def measure(fn, queries, limit: int):
+    """p50 и p99 времени выполнения поиска в миллисекундах"""
+    timings = []
+    for query in queries:
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            fn(db, query, limit=limit)
+            timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+    percentiles = statistics.quantiles(timings, n=100)
+    return statistics.median(timings), percentiles[98]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seed", action="store_true")
+    parser.add_argument("--products", type=int, default=500_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.seed:
+        db = SessionLocal()
+        try:
+            seed(db, args.products)
+        finally:
+            db.close()
+
+    rng = random.Random(42)
+    queries = [rng.choice(WORDS) for _ in range(args.queries)]
+
+    for name, fn in (
+        ("ILIKE", crud_product.search_products),
+        ("tsvector", crud_product.search_products_ranked),
+        ("trigram", crud_product.search_products_fuzzy),
+        ("suggest", crud_product.suggest_products),
+    ):
+        p50, p99 = measure(fn, queries, args.limit)
+        print(f"{name:>10}: p50 {p50:8.1f} мс, p99 {p99:8.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сериализации списка товаров (GET /products?limit=1000):
+- FastAPI по response_model: валидация, перевод в jsonable-словари, json.dumps
+- json_response: один проход TypeAdapter и dump_json в pydantic-core
+- весь запрос через ASGI (без сети) с текущей реализацией обработчика
+
+Выводит медиану в микросекундах на товар.
+
+Запуск на отдельной базе (сидирование добавляет данные в таблицы):
+    python -m app.scripts.bench_serialization --seed --products 1000 --photos 10
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from fastapi.testclient import TestClient
+from app.database import SessionLocal
+from app.main import app
+from app.core.serialization import json_response
+from app.crud import product as crud_product
+from app.schemas.product import ProductWithExtendedInfo
+from app.scripts.bench_product_listing import seed
+
+
+def fastapi_default(field, products) -> bytes:
+    """Путь FastAPI, когда обработчик возвращает ORM-объекты"""
+    content = asyncio.run(
+        serialize_response(field=field, response_content=products, is_coroutine=True)
+    )
+    return JSONResponse(content).body
+
+
+def type_adapter(field, products) -> bytes:
+    return json_response(List[ProductWithExtendedInfo], products).body
+
+
+def measure(fn, repeat: int) -> float:
+    """Медиана времени fn в микросекундах"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seed", action="store_true")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--photos", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.seed:
+            seed(db, args.products, args.photos)
+        products = crud_product.get_products(db, limit=args.limit)
+        if not products:
+            print("В базе нет товаров, запустите с --seed")
+            return
+        count = len(products)
+
+        route = next(
+            route
+            for route in app.routes
+            if isinstance(route, APIRoute)
+            and route.path == "/products"
+            and "GET" in route.methods
+        )
+        bodies = {}
+        for name, fn in (
+            ("FastAPI response_model", fastapi_default),
+            ("TypeAdapter.dump_json", type_adapter),
+        ):
+            bodies[name] = fn(route.response_field, products)
+            total = measure(lambda: fn(route.response_field, products), args.repeat)
+            print(f"{name:>24}: {total / count:8.1f} мкс/товар ({count} товаров)")
+    finally:
+        db.close()
+
+    if len(set(bodies.values())) != 1:
+        print("ВНИМАНИЕ: тела ответов различаются")
+
+    with TestClient(app) as client:
+        path = f"/products?limit={args.limit}"
+        client.get(path).raise_for_status()
+        total = measure(lambda: client.get(path).raise_for_status(), args.repeat)
+    print(f"{'GET ' + path:>24}: {total / count:8.1f} мкс/товар (с запросом к базе)")
+
+
+if __name__ == "__main__":
+    main()
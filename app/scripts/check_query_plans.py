@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Проверка планов запросов каталога: выполняет типовые запросы из app/crud,
+для каждого SELECT получает EXPLAIN и завершается с кодом 1, если планировщик
+выбрал последовательное сканирование (Seq Scan) одной из больших таблиц.
+
+Запуск на отдельной базе (сидирование добавляет данные в таблицы):
+    python -m app.scripts.check_query_plans --seed --products 100000
+"""
+
+import argparse
+import os
+import sys
+from typing import Any, Dict, Iterator, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, engine
+from app.models.category import Category
+from app.models.product import Product
+from app.models.product_type import ProductType
+from app.core.pagination import next_cursor
+from app.crud import carpet as crud_carpet
+from app.crud import category as crud_category
+from app.crud import photo as crud_photo
+from app.crud import product as crud_product
+from app.schemas.category import CategoryCreate
+
+# Таблицы, которые растут вместе с каталогом: для них Seq Scan — регрессия.
+# Справочники (категории, типы товаров) малы и читаются целиком
+CHECKED_TABLES = {"products", "product_photos", "carpets"}
+
+CATEGORIES = 50
+
+
+def seed(db: Session, products: int, photos: int) -> None:
+    """Заполнить базу категориями, товарами, фотографиями и коврами"""
+    product_type = ProductType(name="Ковры (планы)", sysname="plan-carpet")
+    db.add(product_type)
+    db.commit()
+
+    category_ids = []
+    for index in range(CATEGORIES):
+        # Первые 10 категорий — корни, остальные распределены под ними
+        parent_id = category_ids[index % 10] if index >= 10 else None
+        category = crud_category.create_category(
+            db,
+            CategoryCreate(
+                name=f"Категория {index}",
+                parent_id=parent_id,
+                product_type_id=product_type.id if index % 2 else None,
+            ),
+        )
+        category_ids.append(category.id)
+
+    db.execute(
+        text(
+            """
+            INSERT INTO products (sku, price, name, description, category_id, amount)
+            SELECT 'PLAN-' || g, (g % 1000) + 0.99, 'Товар ' || g,
+                   'Описание товара ' || g, (CAST(:categories AS bigint[]))[1 + g % :n],
+                   g % 50
+            FROM generate_series(1, :count) AS g
+            """
+        ),
+        {"count": products, "categories": category_ids, "n": len(category_ids)},
+    )
+    db.execute(
+        text(
+            """
+            INSERT INTO product_photos
+                (product_id, filename, filepath, thumbpath, is_main, sort_order)
+            SELECT p.id, p.id || '_' || k || '.jpg',
+                   'media/products/' || p.id || '/' || p.id || '_' || k || '.jpg',
+                   'media/products/' || p.id || '/thumb_' || p.id || '_' || k || '.jpg',
+                   k = 0, k
+            FROM products p CROSS JOIN generate_series(0, :k - 1) AS k
+            WHERE p.sku LIKE 'PLAN-%'
+            """
+        ),
+        {"k": photos},
+    )
+    db.execute(
+        text(
+            """
+            INSERT INTO carpets (product_id, width, length, material, origin)
+            SELECT p.id, 0.5 + (p.id % 400) / 100.0, 1 + (p.id % 600) / 100.0,
+                   (ARRAY['шерсть', 'шелк', 'хлопок'])[1 + p.id % 3],
+                   (ARRAY['Иран', 'Турция', 'Афганистан'])[1 + p.id % 3]
+            FROM products p
+            WHERE p.sku LIKE 'PLAN-%'
+            """
+        )
+    )
+    db.commit()
+    for table in sorted(CHECKED_TABLES):
+        db.execute(text(f"ANALYZE {table}"))
+    db.commit()
+
+
+def plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Все узлы дерева плана"""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def explain_selects(db: Session, fn) -> List[Dict[str, Any]]:
+    """Выполнить fn и вернуть планы всех отправленных в базу SELECT"""
+    plans = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "(SELECT", "WITH")):
+            cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+            plans.append({"statement": statement, "plan": cursor.fetchone()[0][0]})
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        fn(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+    return plans
+
+
+def cases(db: Session) -> Dict[str, Any]:
+    """Проверяемые запросы: горячие пути чтения каталога"""
+    product = db.query(Product).filter(Product.sku.like("PLAN-%")).first()
+    leaf = (
+        db.query(Category)
+        .filter(Category.parent_id.isnot(None))
+        .order_by(Category.id)
+        .first()
+    )
+    root = db.query(Category).filter(Category.id == leaf.parent_id).first()
+
+    def second_page(sort: str):
+        def run(db: Session):
+            first = crud_product.get_products(db, limit=20, sort=sort)
+            cursor = next_cursor(first, sort, crud_product.PRODUCT_SORT_COLUMNS, 20)
+            return crud_product.get_products(db, limit=20, cursor=cursor, sort=sort)
+
+        return run
+
+    return {
+        "список товаров по id": lambda db: crud_product.get_products(db, limit=20),
+        "список товаров, курсор по цене": second_page("price"),
+        "список товаров, курсор по -цене": second_page("-price"),
+        "список товаров, курсор по названию": second_page("name"),
+        "товары листовой категории": lambda db: (
+            crud_product.get_products_by_category_id_with_extended_info(
+                db, leaf.id, limit=20
+            )
+        ),
+        "товары поддерева категории": lambda db: (
+            crud_product.get_products_by_category_id_with_extended_info(
+                db, root.id, limit=20
+            )
+        ),
+        "товары типа": lambda db: (
+            crud_product.get_products_by_product_type_sysname_with_extended_info(
+                db, "plan-carpet", limit=20
+            )
+        ),
+        "карточка товара": lambda db: crud_product.get_product_with_extended_info(
+            db, product.id
+        ),
+        "карточка товара по SKU": lambda db: (
+            crud_product.get_product_by_sku_with_extended_info(db, product.sku)
+        ),
+        "фото товара": lambda db: crud_photo.get_photos_by_product(db, product.id),
+        "ковры по размеру": lambda db: crud_carpet.get_carpets_by_size_range(
+            db, min_width=2.5, max_width=2.55, limit=20
+        ),
+        "подсказки": lambda db: crud_product.suggest_products(db, "товар 123"),
+        "поиск подстроки": lambda db: crud_product.search_products(
+            db, "товар 12345", limit=20
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seed", action="store_true")
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--photos", type=int, default=3)
+    parser.add_argument("--verbose", action="store_true", help="печатать SQL")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.seed:
+            seed(db, args.products, args.photos)
+
+        failures = 0
+        for name, fn in cases(db).items():
+            seq_scans = []
+            for explained in explain_selects(db, fn):
+                for node in plan_nodes(explained["plan"]["Plan"]):
+                    if (
+                        node["Node Type"] == "Seq Scan"
+                        and node.get("Relation Name") in CHECKED_TABLES
+                    ):
+                        seq_scans.append((node["Relation Name"], explained))
+            db.rollback()
+
+            if seq_scans:
+                failures += 1
+                tables = ", ".join(sorted({table for table, _ in seq_scans}))
+                print(f"FAIL {name}: Seq Scan по {tables}")
+                if args.verbose:
+                    for _, explained in seq_scans:
+                        print(explained["statement"])
+            else:
+                print(f"  ok {name}")
+    finally:
+        db.close()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Проверка бэкендов кэша ответов (app/core/cache.py): память процесса и Redis.
+
+Для каждого бэкенда: запись и чтение, истечение TTL, сброс по тегам
+(delete_tags) и защита от сохранения ответа, собранного до инвалидации
+(поколение ResponseCache). Завершается с кодом 1, если проверка не прошла.
+
+Redis проверяется на fakeredis (pip install fakeredis) или, с --redis-url,
+на настоящем сервере (ключи с отдельным префиксом удаляются после проверки):
+    python -m app.scripts.check_response_cache
+    python -m app.scripts.check_response_cache --redis-url redis://localhost:6379/15
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import uuid
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.requests import Request
+from app.core.cache import MemoryBackend, RedisBackend, ResponseCache
+
+
+def make_request(path: str, query: str = "") -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "query_string": query.encode(),
+            "headers": [],
+        }
+    )
+
+
+async def check_backend(backend) -> List[str]:
+    """Список непройденных проверок бэкенда"""
+    failures = []
+
+    await backend.set("a", b"body-a", 60, ["product:1", "category:1"])
+    await backend.set("b", b"body-b", 60, ["product:2", "category:1"])
+    await backend.set("c", b"body-c", 60, ["product:3"])
+    if await backend.get("a") != b"body-a":
+        failures.append("set/get: запись не читается")
+    if await backend.get("missing") is not None:
+        failures.append("get: найдена несуществующая запись")
+
+    await backend.delete_tags(["product:1"])
+    if await backend.get("a") is not None:
+        failures.append("delete_tags: запись с тегом осталась")
+    if await backend.get("b") != b"body-b":
+        failures.append("delete_tags: удалена запись без тега")
+    await backend.delete_tags(["category:1"])
+    if await backend.get("b") is not None:
+        failures.append("delete_tags: запись со вторым тегом осталась")
+    if await backend.get("c") != b"body-c":
+        failures.append("delete_tags: удалена запись чужого тега")
+    await backend.delete_tags(["unknown"])
+    await backend.delete_tags([])
+
+    await backend.set("short", b"body", 1, ["product:4"])
+    await asyncio.sleep(1.2)
+    if await backend.get("short") is not None:
+        failures.append("ttl: запись не истекла")
+
+    cache = ResponseCache(backend, ttl=60)
+    request = make_request("/products", "limit=10&offset=0")
+    key = cache.key(request)
+    if key != cache.key(make_request("/products", "offset=0&limit=10")):
+        failures.append("key: зависит от порядка параметров")
+
+    # Ответ собран до инвалидации: в кэш не попадает
+    if await cache.get(request) is not None:
+        failures.append("ResponseCache: попадание в пустом кэше")
+    await cache.invalidate("product:5")
+    await cache.store(request, Dict[str, int], {"id": 5}, tags=["product:5"])
+    if await backend.get(key) is not None:
+        failures.append("ResponseCache: сохранён ответ, собранный до инвалидации")
+
+    # Обычный цикл: промах, сохранение, попадание, сброс по тегу
+    await cache.get(request)
+    await cache.store(request, Dict[str, int], {"id": 5}, tags=["product:5"])
+    cached = await cache.get(request)
+    if cached is None or cached.body != b'{"id":5}':
+        failures.append("ResponseCache: нет попадания после сохранения")
+    elif cached.headers.get("X-Cache") != "HIT":
+        failures.append("ResponseCache: нет заголовка X-Cache: HIT")
+    await cache.invalidate("product:5")
+    if await cache.get(request) is not None:
+        failures.append("ResponseCache: запись осталась после invalidate")
+
+    return failures
+
+
+async def check_memory_limit() -> List[str]:
+    backend = MemoryBackend(max_entries=2)
+    await backend.set("a", b"a", 60, ["t"])
+    await backend.set("b", b"b", 60, ["t"])
+    await backend.get("a")
+    await backend.set("c", b"c", 60, ["t"])
+    if await backend.get("b") is not None or len(backend) != 2:
+        failures = ["memory: не вытеснена самая старая по обращению запись"]
+    else:
+        failures = []
+    await backend.delete_tags(["t"])
+    if len(backend) or backend._tags:
+        failures.append("memory: после delete_tags остались записи или теги")
+    return failures
+
+
+def redis_client(url: str):
+    if url:
+        from redis.asyncio import Redis
+
+        return Redis.from_url(url)
+    try:
+        from fakeredis import FakeAsyncRedis
+    except ImportError:
+        return None
+    return FakeAsyncRedis()
+
+
+async def run(redis_url: str) -> int:
+    results = {
+        "memory": await check_backend(MemoryBackend(max_entries=100))
+        + await check_memory_limit()
+    }
+
+    client = redis_client(redis_url)
+    if client is None:
+        print("redis: пропущен — установите fakeredis или укажите --redis-url")
+    else:
+        prefix = f"check:{uuid.uuid4().hex}:"
+        try:
+            results["redis"] = await check_backend(RedisBackend(client, prefix))
+        finally:
+            keys = [key async for key in client.scan_iter(f"{prefix}*")]
+            if keys:
+                await client.delete(*keys)
+            await client.aclose()
+
+    failed = 0
+    for name, failures in results.items():
+        print(f"{name}: {'ок' if not failures else 'ОШИБКИ'}")
+        for failure in failures:
+            print(f"  - {failure}")
+        failed += len(failures)
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--redis-url", default="")
+    args = parser.parse_args()
+    sys.exit(1 if asyncio.run(run(args.redis_url)) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Индекс дерева категорий в памяти процесса
+"""
+
+import threading
+import time
+from typing import Dict, FrozenSet, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import CATEGORY_TREE_TTL_SECONDS
+from app.models.category import Category
+from app.models.product import Product
+from app.schemas.category import CategoryWithComputed
+
+
+class CategoryTree:
+    """Снимок дерева категорий: узлы, списки смежности и вычисленные поля.
+
+    Строится за O(n) по запросу категорий и одному агрегату количества
+    товаров, после построения не обращается к БД.
+    """
+
+    def __init__(self, rows, product_counts: Optional[Dict[int, int]] = None):
+        self.nodes = {row.id: row for row in rows}
+        self.children: Dict[int, List[int]] = {node_id: [] for node_id in self.nodes}
+        self.roots: List[int] = []
+
+        for row in rows:
+            if row.parent_id is None or row.parent_id not in self.nodes:
+                self.roots.append(row.id)
+            else:
+                self.children[row.parent_id].append(row.id)
+
+        # Обход в ширину от корней: глубина и порядок для подсчёта потомков
+        self.depth: Dict[int, int] = {}
+        order: List[int] = []
+        queue = list(self.roots)
+        for node_id in queue:
+            self.depth.setdefault(node_id, 0)
+            order.append(node_id)
+            for child_id in self.children[node_id]:
+                self.depth[child_id] = self.depth[node_id] + 1
+                queue.append(child_id)
+
+        # Потомки и товары поддерева считаются снизу вверх по детям
+        product_counts = product_counts or {}
+        self.product_count: Dict[int, int] = {}
+        self.subtree_product_count: Dict[int, int] = {}
+        descendants: Dict[int, FrozenSet[int]] = {}
+        for node_id in reversed(order):
+            collected = set()
+            own_count = product_counts.get(node_id, 0)
+            subtree_count = own_count
+            for child_id in self.children[node_id]:
+                collected.add(child_id)
+                collected.update(descendants[child_id])
+                subtree_count += self.subtree_product_count[child_id]
+            descendants[node_id] = frozenset(collected)
+            self.product_count[node_id] = own_count
+            self.subtree_product_count[node_id] = subtree_count
+        self.descendants = descendants
+
+        # Версия снимка для ETag: число категорий, последнее изменение
+        # и счётчики товаров (они меняются без изменения самих категорий)
+        self.version = (
+            len(self.nodes),
+            max((row.updated_at for row in rows if row.updated_at), default=None),
+            tuple(sorted(product_counts.items())),
+        )
+
+        self._tree: Optional[List[CategoryWithComputed]] = None
+
+    def __contains__(self, category_id: int) -> bool:
+        return category_id in self.nodes
+
+    def is_leaf(self, category_id: int) -> bool:
+        return not self.children[category_id]
+
+    def subtree_ids(self, category_id: int) -> List[int]:
+        """ID категории и всех её потомков"""
+        return [category_id, *self.descendants.get(category_id, ())]
+
+    def to_schema(
+        self, category_id: int, include_children: bool = True
+    ) -> CategoryWithComputed:
+        """Собрать схему категории с вычисляемыми полями"""
+        node = self.nodes[category_id]
+        return CategoryWithComputed(
+            id=node.id,
+            name=node.name,
+            product_type_id=node.product_type_id,
+            parent_id=node.parent_id,
+            created_at=node.created_at,
+            updated_at=node.updated_at,
+            is_leaf=self.is_leaf(category_id),
+            product_count=self.product_count.get(category_id, 0),
+            subtree_product_count=self.subtree_product_count.get(category_id, 0),
+            children=(
+                [self.to_schema(child_id) for child_id in self.children[category_id]]
+                if include_children
+                else []
+            ),
+        )
+
+    def tree(self) -> List[CategoryWithComputed]:
+        """Полное дерево от корней (строится один раз на снимок)"""
+        if self._tree is None:
+            self._tree = [self.to_schema(root_id) for root_id in self.roots]
+        return self._tree
+
+    def all(self) -> List[CategoryWithComputed]:
+        """Все категории без вложенных детей, по возрастанию ID"""
+        return [
+            self.to_schema(category_id, include_children=False)
+            for category_id in sorted(self.nodes)
+        ]
+
+
+class CategoryTreeIndex:
+    """Общий для процесса кэш снимка дерева категорий.
+
+    Изменение категорий через crud помечает снимок устаревшим; TTL
+    ограничивает устаревание, когда запись прошла через другой процесс.
+
+    Перестраивает снимок только запрос, захвативший блокировку; остальные
+    тем временем получают предыдущий снимок. Блокировку никто не ждёт:
+    get вызывается и из асинхронных обработчиков (через run_sync), где
+    ожидание остановило бы цикл событий. Собственный снимок строит запрос,
+    только если снимка ещё нет совсем (первые запросы процесса).
+    """
+
+    def __init__(self, ttl_seconds: float = CATEGORY_TREE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._tree: Optional[CategoryTree] = None
+        self._built_at = 0.0
+        self._stale = False
+        # Номер поколения: снимок, построенный во время invalidate(),
+        # сохраняется, но остаётся устаревшим
+        self._generation = 0
+
+    def get(self, db: Session) -> CategoryTree:
+        """Текущий снимок дерева; устаревший или истёкший по TTL перестраивается"""
+        tree = self._tree
+        if (
+            tree is not None
+            and not self._stale
+            and time.monotonic() - self._built_at < self.ttl_seconds
+        ):
+            return tree
+
+        if not self._lock.acquire(blocking=False):
+            return tree if tree is not None else self.build(db)
+        try:
+            generation = self._generation
+            tree = self.build(db)
+            self._tree = tree
+            self._built_at = time.monotonic()
+            self._stale = generation != self._generation
+            return tree
+        finally:
+            self._lock.release()
+
+    def get_containing(self, db: Session, category_id: int) -> CategoryTree:
+        """Снимок дерева, в котором есть категория, если она есть в базе.
+
+        Категория, созданная через другой процесс, попадает в снимок этого
+        процесса только после TTL. При промахе наличие проверяется запросом
+        по первичному ключу, и только найденная категория перестраивает
+        снимок: несуществующие ID не вызывают перестроений.
+        """
+        tree = self.get(db)
+        if category_id in tree:
+            return tree
+        if db.query(Category.id).filter(Category.id == category_id).first() is None:
+            return tree
+        self.invalidate()
+        tree = self.get(db)
+        if category_id not in tree:
+            # Снимок перестраивает другой запрос и отдал предыдущий
+            tree = self.build(db)
+        return tree
+
+    def invalidate(self) -> None:
+        """Пометить снимок устаревшим; следующий запрос перестроит его.
+
+        Вызывается после изменения категорий и после изменения товаров,
+        меняющего количество товаров в категориях. До конца перестроения
+        остальные запросы получают предыдущий снимок.
+        """
+        self._generation += 1
+        self._stale = True
+
+    @staticmethod
+    def build(db: Session) -> CategoryTree:
+        """Построить снимок: запрос категорий и агрегат товаров по категориям"""
+        rows = (
+            db.query(
+                Category.id,
+                Category.name,
+                Category.product_type_id,
+                Category.parent_id,
+                Category.created_at,
+                Category.updated_at,
+            )
+            .order_by(Category.id)
+            .all()
+        )
+        product_counts = dict(
+            db.query(Product.category_id, func.count(Product.id))
+            .filter(Product.category_id.isnot(None))
+            .group_by(Product.category_id)
+            .all()
+        )
+        return CategoryTree(rows, product_counts)
+
+
+category_tree_index = CategoryTreeIndex()
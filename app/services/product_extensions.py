@@ -2,34 +2,114 @@
 Сервис для обработки расширенной информации о товарах
 """
 
-from typing import Dict, Any, Optional
-from sqlalchemy.orm import Session
+from typing import Callable, Dict, Any, Iterable, List, Optional
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 from app.models.product import Product
+from app.models.carpet import Carpet
+
+
+def columns_serializer(*fields: str) -> Callable[[Any], Dict[str, Any]]:
+    """Сериализатор строки расширения в словарь из перечисленных полей"""
+
+    def serialize(row: Any) -> Dict[str, Any]:
+        return {field: getattr(row, field) for field in fields}
+
+    return serialize
+
+
+class ProductExtension:
+    """Таблица расширения типа товара: модель, связь с Product и сериализатор"""
+
+    def __init__(
+        self,
+        sysname: str,
+        model: Any,
+        relationship: Any,
+        serializer: Callable[[Any], Dict[str, Any]],
+    ):
+        self.sysname = sysname
+        self.model = model
+        self.relationship = relationship
+        self.serializer = serializer
 
 
 class ProductExtensionService:
     """Сервис для добавления расширенной информации к товарам"""
 
-    @staticmethod
+    # sysname типа товара -> описание таблицы расширения
+    _registry: Dict[str, ProductExtension] = {}
+
+    @classmethod
+    def register(
+        cls,
+        sysname: str,
+        model: Any,
+        relationship: Any,
+        serializer: Callable[[Any], Dict[str, Any]],
+    ) -> None:
+        """Зарегистрировать таблицу расширения для типа товара"""
+        cls._registry[sysname] = ProductExtension(
+            sysname, model, relationship, serializer
+        )
+
+    @classmethod
+    def get_extension(cls, sysname: Optional[str]) -> Optional[ProductExtension]:
+        return cls._registry.get(sysname) if sysname else None
+
+    @classmethod
+    def joined_load_options(cls) -> List[Any]:
+        """Опции загрузки всех таблиц расширений одним запросом с товаром"""
+        return [joinedload(ext.relationship) for ext in cls._registry.values()]
+
+    @classmethod
     def get_extended_info(
-        product: Product, category_sysname: str
+        cls, product: Product, category_sysname: str
     ) -> Optional[Dict[str, Any]]:
         """Получить расширенную информацию для товара в зависимости от типа"""
-
-        if category_sysname == "carpet":
-            return ProductExtensionService._get_carpet_info(product)
-        else:
+        extension = cls.get_extension(category_sysname)
+        if extension is None:
             return None
+        row = getattr(product, extension.relationship.key)
+        return extension.serializer(row) if row is not None else None
+
+    @classmethod
+    def attach_extended_info(cls, db: Session, products: Iterable[Product]) -> None:
+        """Заполнить extended_info для страницы товаров.
+
+        Товары группируются по типу, и для каждой таблицы расширения выполняется
+        один запрос `WHERE product_id IN (...)`. Число запросов зависит от
+        количества типов на странице, а не от количества товаров. Категория и
+        тип товара должны быть уже загружены.
+        """
+        by_type: Dict[str, List[Product]] = {}
+        for product in products:
+            product.extended_info = None
+            extension = cls.get_extension(product.category_product_type_sysname)
+            if extension is not None:
+                by_type.setdefault(extension.sysname, []).append(product)
+
+        for sysname, typed_products in by_type.items():
+            extension = cls._registry[sysname]
+            model = extension.model
+            rows = (
+                db.query(model)
+                .filter(model.product_id.in_([p.id for p in typed_products]))
+                .all()
+            )
+            rows_by_product = {row.product_id: row for row in rows}
+
+            for product in typed_products:
+                row = rows_by_product.get(product.id)
+                # Проставляем связь без ленивой загрузки при последующем обращении
+                set_committed_value(product, extension.relationship.key, row)
+                if row is not None:
+                    product.extended_info = extension.serializer(row)
+
 
-    @staticmethod
-    def _get_carpet_info(product: Product) -> Optional[Dict[str, Any]]:
-        """Получить информацию о ковре"""
-        if hasattr(product, "carpet") and product.carpet:
-            return {
-                "width": product.carpet.width,
-                "length": product.carpet.length,
-                "material": product.carpet.material,
-                "origin": product.carpet.origin,
-                "age": product.carpet.age,
-            }
-        return None
+ProductExtensionService.register(
+    "carpet",
+    Carpet,
+    Product.carpet,
+    columns_serializer("width", "length", "material", "origin", "age"),
+)
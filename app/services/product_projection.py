@@ -0,0 +1,144 @@
+"""
+Проекция списков товаров: параметры fields и include.
+
+fields сужает SELECT товаров до перечисленных колонок (load_only), include
+перечисляет связи, которые нужно загрузить: photos — все фото, main_photo —
+только главное фото, extended_info — данные таблицы расширения типа товара.
+Связи, которых нет в include, не загружаются. Без обоих параметров список
+отдаётся целиком, как раньше.
+"""
+
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Tuple
+
+from pydantic import ConfigDict, create_model
+from sqlalchemy.orm import load_only, selectinload
+
+from app.models.category import Category
+from app.models.product import Product
+from app.models.product_photo import ProductPhoto
+from app.schemas.product import ProductWithExtendedInfo
+from app.schemas.product_photo import ProductPhotoOut
+
+# Поле ответа -> колонка products
+COLUMN_FIELDS = {
+    "id": Product.id,
+    "sku": Product.sku,
+    "price": Product.price,
+    "name": Product.name,
+    "description": Product.description,
+    "category_id": Product.category_id,
+    "amount": Product.amount,
+    "created_at": Product.created_at,
+    "updated_at": Product.updated_at,
+}
+# Поля, которые берутся из категории и её типа товара
+CATEGORY_FIELDS = ("category_name", "category_product_type_sysname")
+FIELDS = (*COLUMN_FIELDS, *CATEGORY_FIELDS)
+INCLUDES = ("photos", "main_photo", "extended_info")
+
+# Колонки, которые грузятся всегда: версия товара для ETag и внешний ключ
+# категории. Колонку сортировки добавляет курсор
+SERVICE_COLUMNS = (
+    Product.id,
+    Product.category_id,
+    Product.created_at,
+    Product.updated_at,
+)
+
+
+def parse_list(value: Optional[str], allowed: Tuple[str, ...], name: str):
+    """Разобрать список через запятую; порядок — как в allowed"""
+    if value is None:
+        return None
+    requested = {item.strip() for item in value.split(",") if item.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise ValueError(
+            f"Неизвестные значения {name}: {', '.join(sorted(unknown))}. "
+            f"Допустимые: {', '.join(allowed)}"
+        )
+    return tuple(item for item in allowed if item in requested)
+
+
+class ProductProjection:
+    """Запрошенные поля и связи товаров списка"""
+
+    def __init__(self, fields: Tuple[str, ...], include: Tuple[str, ...]):
+        self.fields = fields
+        self.include = include
+
+    @classmethod
+    def from_query(
+        cls, fields: Optional[str], include: Optional[str]
+    ) -> Optional["ProductProjection"]:
+        """Проекция из параметров запроса или None, если список нужен целиком.
+
+        Без fields возвращаются все поля товара, без include — ни одной связи.
+        """
+        if fields is None and include is None:
+            return None
+        return cls(
+            parse_list(fields, FIELDS, "fields") or FIELDS,
+            parse_list(include, INCLUDES, "include") or (),
+        )
+
+    @property
+    def key(self) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        return self.fields, self.include
+
+    @property
+    def loads_category(self) -> bool:
+        """Категория и тип товара нужны для их полей и для extended_info"""
+        return "extended_info" in self.include or any(
+            field in CATEGORY_FIELDS for field in self.fields
+        )
+
+    @property
+    def with_extended_info(self) -> bool:
+        return "extended_info" in self.include
+
+    def load_options(self, extra_columns: Iterable[Any] = ()) -> List[Any]:
+        """Опции запроса товаров страницы: колонки и связи проекции"""
+        columns = {column.key: column for column in SERVICE_COLUMNS}
+        for field in self.fields:
+            if field in COLUMN_FIELDS:
+                columns[field] = COLUMN_FIELDS[field]
+        for column in extra_columns:
+            columns[column.key] = column
+
+        options = [load_only(*columns.values())]
+        if "photos" in self.include:
+            options.append(selectinload(Product.photos))
+        elif "main_photo" in self.include:
+            # Частичный уникальный индекс uq_product_photos_main: одна строка на товар
+            options.append(
+                selectinload(Product.photos.and_(ProductPhoto.is_main == True))
+            )
+        if self.loads_category:
+            options.append(
+                selectinload(Product.category).selectinload(Category.product_type)
+            )
+        return options
+
+    @property
+    def response_type(self):
+        return _projection_response_type(self.fields, self.include)
+
+
+@lru_cache(maxsize=None)
+def _projection_response_type(fields: Tuple[str, ...], include: Tuple[str, ...]):
+    """Схема ответа: поля ProductWithExtendedInfo из проекции"""
+    model_fields = ProductWithExtendedInfo.model_fields
+    definitions = {
+        name: (model_fields[name].annotation, model_fields[name])
+        for name in (*fields, *(name for name in include if name in model_fields))
+    }
+    if "main_photo" in include:
+        definitions["main_photo"] = (Optional[ProductPhotoOut], None)
+    model = create_model(
+        "ProductProjection",
+        __config__=ConfigDict(from_attributes=True),
+        **definitions,
+    )
+    return List[model]
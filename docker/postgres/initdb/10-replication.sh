@@ -0,0 +1,6 @@
+#!/bin/sh
+# Разрешить потоковую репликацию для сервиса db-replica (профиль replica)
+set -e
+PGDATA="${PGDATA:-/var/lib/postgresql/data}"
+LINE="host replication all all scram-sha-256"
+grep -qxF "$LINE" "$PGDATA/pg_hba.conf" || echo "$LINE" >> "$PGDATA/pg_hba.conf"